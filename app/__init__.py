@@ -1,5 +1,4 @@
-from app.view import AppGUI
-
-
 def create_app():
+    # -- Imported here so that the solver can be used without tkinter / matplotlib -- #
+    from app.view import AppGUI
     return AppGUI()
@@ -0,0 +1,218 @@
+"""
+    Benchmark
+
+        python -m app benchmark random:50 random:1000 path/to/berlin52.tsp --output results.json
+        python -m app benchmark ... --baseline baseline.json
+
+    Runs the genetic algorithm on each instance, every run in a fresh
+    process so that its peak memory is its own, and reports:
+        - generations per second
+        - time spent per phase (selection, crossover, mutation, fitness, ...)
+        - peak memory (max resident set size, or the peak of Python
+          allocations where the resource module is missing, e.g. Windows)
+        - gap to the known optimum over time
+
+    Instances are either random:N (N cities drawn uniformly in a
+    1000 x 1000 square from a fixed seed), a TSPLIB .tsp file or any
+    other file app.loaders reads.
+    The gap is measured on the closed route (last city back to the
+    first), which is what the TSPLIB optima are given for; random
+    instances have no known optimum, so only their distance is kept.
+"""
+import json
+import multiprocessing
+import os
+import random
+import time
+import tracemalloc
+from app.loaders import TSPLIB_EXTENSIONS, load_file, load_tsplib
+from app.stopping import StoppingCriteria
+
+# -- Optimal closed route length of TSPLIB instances -- #
+KNOWN_OPTIMA = {
+    'berlin52': 7542,
+    'kroA100': 21282,
+    'pr1002': 259045,
+}
+
+ENGINES = ('object', 'vectorized')
+
+
+def load_instance(instance: str, seed: int, columns: tuple = None) -> tuple:
+    """     Returns (name, coordinates, known optimum or None), columns being the (x, y) fields of CSV files      """
+    if instance.startswith('random:'):
+        size = int(instance.split(':', 1)[1])
+        generator = random.Random(f'{seed}:{size}')
+        return instance, [(generator.uniform(0, 1000), generator.uniform(0, 1000)) for _ in range(size)], None
+    name = None
+    if instance.lower().endswith(TSPLIB_EXTENSIONS):
+        name, coordinates = load_tsplib(instance)
+    else:
+        coordinates = load_file(instance, columns)
+    name = name or os.path.splitext(os.path.basename(instance))[0]
+    return name, coordinates, KNOWN_OPTIMA.get(name)
+
+
+def create_engine(engine: str):
+    if engine == 'vectorized':
+        # -- Only imported when asked for, NumPy is optional -- #
+        from app.vectorized import VectorizedRouteOptimizationGeneticAlgorithm
+        return VectorizedRouteOptimizationGeneticAlgorithm()
+    from app.genetic_algorithm import RouteOptimizationGeneticAlgorithm
+    return RouteOptimizationGeneticAlgorithm()
+
+
+def get_closed_distance(genetic_algorithm, po) -> float:
+    """     Route length including the connection from the last city back to the first     """
+    return po.total_distance + genetic_algorithm.distance_matrix[po.data[-1]][po.data[0]]
+
+
+def start_peak_memory() -> None:
+    """     Without the (Unix only) resource module, Python allocations are traced from here on instead     """
+    try:
+        import resource
+    except ImportError:
+        tracemalloc.start()
+
+
+def get_peak_memory_kb() -> float:
+    """     Peak memory of this process so far, in kilobytes      """
+    try:
+        import resource
+    except ImportError:
+        return tracemalloc.get_traced_memory()[1] / 1024
+    # -- ru_maxrss is in kilobytes on Linux -- #
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_case(case: dict) -> dict:
+    """     One benchmark run. Executed in its own process      """
+    start_peak_memory()
+    name, coordinates, optimum = load_instance(case['instance'], case['seed'], case['columns'])
+    genetic_algorithm = create_engine(case['engine'])
+    started = time.perf_counter()
+    genetic_algorithm.init(
+        available_coordinates=coordinates,
+        population_size=case['population'],
+        mutation_rate=case['mutation_rate'],
+        minimizing_factor=case['minimizing_factor'],
+        profile=True,
+        seed=case['seed'],
+        **case['options'],
+    )
+    init_seconds = time.perf_counter() - started
+    # -- Phases of the initial population are not part of the run -- #
+    genetic_algorithm.profiler.reset()
+
+    # -- Evolve, recording every improvement of the best order -- #
+    progress = list()
+    started = time.perf_counter()
+    for best in genetic_algorithm.run(until=StoppingCriteria(max_generations=case['generations'], time_budget=case['time_budget'])):
+        closed = get_closed_distance(genetic_algorithm, best)
+        progress.append({
+            'seconds': time.perf_counter() - started,
+            'generation': genetic_algorithm.generation,
+            'total_distance': best.total_distance,
+            'closed_distance': closed,
+            'gap': closed / optimum - 1 if optimum else None,
+        })
+    elapsed = time.perf_counter() - started
+    profile = genetic_algorithm.profiler.get_snapshot()
+
+    return {
+        'instance': name,
+        'engine': case['engine'],
+        'cities': len(coordinates),
+        'population': case['population'],
+        'options': case['options'],
+        'optimum': optimum,
+        'generations': genetic_algorithm.generation,
+        'init_seconds': init_seconds,
+        'seconds': elapsed,
+        'generations_per_second': genetic_algorithm.generation / elapsed if elapsed else None,
+        'phase_seconds': profile['phase_seconds'],
+        'counters': profile['counters'],
+        'peak_memory_kb': get_peak_memory_kb(),
+        'best_total_distance': progress[-1]['total_distance'] if progress else None,
+        'best_gap': progress[-1]['gap'] if progress else None,
+        'progress': progress,
+    }
+
+
+def run_benchmark(instances: list, engines: list, population: int, generations: int, time_budget: float,
+                  mutation_rate: float, minimizing_factor: float, seed: int, options: dict, columns: tuple = None) -> dict:
+    """     Runs every instance with every engine, each in a fresh process      """
+    results = list()
+    for instance in instances:
+        for engine in engines:
+            case = {
+                'instance': instance,
+                'engine': engine,
+                'population': population,
+                'generations': generations,
+                'time_budget': time_budget,
+                'mutation_rate': mutation_rate,
+                'minimizing_factor': minimizing_factor,
+                'seed': seed,
+                'columns': columns,
+                'options': options if engine == 'object' else dict(),
+            }
+            with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+                results.append(pool.apply(run_case, (case,)))
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'seed': seed,
+        'results': results,
+    }
+
+
+def get_case_key(result: dict) -> str:
+    return f"{result['instance']}/{result['engine']}/{result['population']}"
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+        Regressions of results against a baseline run: generations per
+        second lower than the baseline by more than tolerance (relative),
+        or final gap / distance worse than the baseline by more than
+        tolerance (relative).
+    """
+    baseline_cases = {get_case_key(result): result for result in baseline['results']}
+    regressions = list()
+    for result in results['results']:
+        key = get_case_key(result)
+        previous = baseline_cases.get(key)
+        if previous is None:
+            continue
+        if result['generations_per_second'] and previous['generations_per_second']:
+            if result['generations_per_second'] < previous['generations_per_second'] * (1 - tolerance):
+                regressions.append(f"{key}: generations/sec {result['generations_per_second']:.1f} < baseline {previous['generations_per_second']:.1f}")
+        for metric in ('best_gap', 'best_total_distance'):
+            if result[metric] is not None and previous[metric] is not None:
+                if result[metric] > previous[metric] + abs(previous[metric]) * tolerance:
+                    regressions.append(f"{key}: {metric} {result[metric]:.4f} > baseline {previous[metric]:.4f}")
+                break
+    return regressions
+
+
+def format_report(results: dict) -> str:
+    lines = list()
+    for result in results['results']:
+        phases = ', '.join(f'{phase} {seconds:.2f}s' for phase, seconds in result['phase_seconds'].items() if seconds)
+        gap = f"{result['best_gap'] * 100:.2f}%" if result['best_gap'] is not None else '-'
+        lines.append(
+            f"{get_case_key(result)}: {result['generations']} generations, "
+            f"{result['generations_per_second']:.1f} gen/s, gap {gap}, "
+            f"distance {result['best_total_distance']:.1f}, peak {result['peak_memory_kb'] / 1024:.1f} MB ({phases})"
+        )
+    return '\n'.join(lines)
+
+
+def save(results: dict, path: str) -> None:
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=2)
+
+
+def load(path: str) -> dict:
+    with open(path) as file:
+        return json.load(file)
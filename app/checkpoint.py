@@ -0,0 +1,198 @@
+"""
+    Checkpoint
+
+        python -m app solve coordinates.txt --checkpoint run.ckpt --checkpoint-every 100
+        python -m app solve --resume run.ckpt --checkpoint run.ckpt
+
+    Saves the full state of a genetic algorithm run (population, best
+    order, generation, stats, seen fingerprints and random state) to
+    one binary file, and restores a run from it.
+
+    File layout:
+        MAGIC (8 bytes) | header length (8 bytes, little endian) | header (JSON)
+        sections, each starting on a 64 byte boundary
+
+    The header holds the small metadata (options, stats, random state)
+    and, per section, its typecode, byte order, offset
+    (from the start of the sections) and shape. The population is one
+    section: a packed (population_size, n_cities) matrix of city
+    indexes, written as a single buffer, so it can also be memory
+    mapped (e.g. numpy.memmap) with its offset and shape.
+
+    A checkpoint is written to a temporary file first and then moved
+    over the previous one, so a crash while writing never loses it.
+"""
+import json
+import os
+import sys
+from array import array
+from app.genetic_algorithm import PopulationOrder, RouteOptimizationGeneticAlgorithm
+from app.loaders import CoordinateArray
+from app.uniqueness import BloomFilter, fingerprint
+
+MAGIC = b'GACKPT01'
+ALIGNMENT = 64
+
+
+def get_padding(size: int) -> int:
+    return -size % ALIGNMENT
+
+
+# ---------- #
+# -- SAVE -- #
+# ---------- #
+
+def save_checkpoint(genetic_algorithm, path: str) -> None:
+    """     Writes the state of genetic_algorithm (object or vectorized engine) to path      """
+    best = genetic_algorithm.best_population_order
+    header = {
+        'engine': 'object' if isinstance(genetic_algorithm, RouteOptimizationGeneticAlgorithm) else 'vectorized',
+        'options': genetic_algorithm.get_options(),
+        'generation': genetic_algorithm.generation,
+        'best_generation': genetic_algorithm.best_generation,
+        'average_fitness': genetic_algorithm.average_fitness,
+        'evaluations': genetic_algorithm.evaluations,
+        'best_total_distance': best.total_distance,
+        'best_fitness_score': best.fitness_score,
+        'sections': dict(),
+    }
+    sections = list()
+
+    def add_section(name: str, buffer, typecode: str, shape: tuple) -> None:
+        offset = sum(len(data) + get_padding(len(data)) for _, data in sections)
+        header['sections'][name] = {'typecode': typecode, 'byteorder': sys.byteorder, 'offset': offset, 'shape': shape}
+        sections.append((name, memoryview(buffer).cast('B')))
+
+    # -- Coordinates, as interleaved x,y values -- #
+    coordinates = genetic_algorithm.coordinates
+    if not isinstance(coordinates, CoordinateArray) or not isinstance(coordinates.values, array) or coordinates.values.typecode != 'd':
+        coordinates = CoordinateArray.from_coordinates(coordinates)
+    add_section('coordinates', coordinates.values, 'd', (len(coordinates), 2))
+
+    # -- Population, best order and fitness (one entry per row) -- #
+    if header['engine'] == 'object':
+        population = genetic_algorithm.population
+        typecode = population[0].data.typecode
+        add_section('population', b''.join(po.data for po in population), typecode, (len(population), len(population[0])))
+        add_section('total_distances', array('d', [po.total_distance for po in population]), 'd', (len(population),))
+        add_section('fitness_scores', array('d', [po.fitness_score for po in population]), 'd', (len(population),))
+        header['random_state'] = genetic_algorithm.rng.getstate()
+    else:
+        population = genetic_algorithm.population
+        typecode = population.dtype.char
+        add_section('population', population, typecode, population.shape)
+        add_section('total_distances', genetic_algorithm.total_distances, 'd', population.shape[:1])
+        add_section('fitness_scores', genetic_algorithm.fitness_scores, 'd', population.shape[:1])
+        header['random_state'] = genetic_algorithm.rng.bit_generator.state
+    add_section('best', array(typecode, best.data), typecode, (len(best.data),))
+
+    # -- Seen fingerprints -- #
+    unique_paths = genetic_algorithm.unique_paths
+    if isinstance(unique_paths, BloomFilter):
+        header['unique_paths_count'] = unique_paths.count
+        add_section('unique_paths', unique_paths.bits, 'B', (len(unique_paths.bits),))
+    else:
+        add_section('unique_paths', array('Q', unique_paths.fingerprints), 'Q', (len(unique_paths),))
+
+    # -- Write, then replace the previous checkpoint -- #
+    encoded_header = json.dumps(header).encode('utf-8')
+    prefix = MAGIC + len(encoded_header).to_bytes(8, 'little') + encoded_header
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'wb') as file:
+        file.write(prefix)
+        file.write(bytes(get_padding(len(prefix))))
+        for _, data in sections:
+            file.write(data)
+            file.write(bytes(get_padding(len(data))))
+    os.replace(temporary_path, path)
+
+
+def get_checkpoint_callback(path: str, every: int):
+    """     Generation callback saving a checkpoint every n-th generation      """
+    def write_checkpoint(genetic_algorithm):
+        if genetic_algorithm.generation % every == 0:
+            save_checkpoint(genetic_algorithm, path)
+    return write_checkpoint
+
+
+# ---------- #
+# -- LOAD -- #
+# ---------- #
+
+def read_checkpoint(path: str) -> tuple:
+    """     Returns (header, sections), sections being name => array of the section      """
+    with open(path, 'rb') as file:
+        content = file.read()
+    if content[:len(MAGIC)] != MAGIC:
+        raise ValueError(f'{path} is not a checkpoint')
+    header_length = int.from_bytes(content[len(MAGIC):len(MAGIC) + 8], 'little')
+    start = len(MAGIC) + 8
+    header = json.loads(content[start:start + header_length].decode('utf-8'))
+    start += header_length
+    start += get_padding(start)
+    sections = dict()
+    for name, section in header['sections'].items():
+        values = array(section['typecode'])
+        count = 1
+        for dimension in section['shape']:
+            count *= dimension
+        offset = start + section['offset']
+        values.frombytes(content[offset:offset + count * values.itemsize])
+        if section['byteorder'] != sys.byteorder:
+            values.byteswap()
+        sections[name] = values
+    return header, sections
+
+
+def load_checkpoint(path: str):
+    """     Genetic algorithm (of the engine that was saved) continuing the checkpointed run      """
+    header, sections = read_checkpoint(path)
+    rows, size = header['sections']['population']['shape']
+    options = dict(header['options'])
+    coordinates = CoordinateArray(sections['coordinates'])
+
+    if header['engine'] == 'object':
+        population = list()
+        data = sections['population']
+        for row in range(rows):
+            po = PopulationOrder(data[row * size:(row + 1) * size], do_shuffle=False)
+            po.total_distance = sections['total_distances'][row]
+            po.fitness_score = sections['fitness_scores'][row]
+            po.fingerprint = fingerprint(po.data)
+            population.append(po)
+        genetic_algorithm = RouteOptimizationGeneticAlgorithm()
+        genetic_algorithm.init(available_coordinates=coordinates, population=population, **options)
+        state = header['random_state']
+        genetic_algorithm.rng.setstate((state[0], tuple(state[1]), state[2]))
+    else:
+        # -- Only imported when needed, NumPy is optional -- #
+        import numpy as np
+        from app.vectorized import VectorizedRouteOptimizationGeneticAlgorithm
+        population = np.frombuffer(sections['population'], dtype=sections['population'].typecode).reshape(rows, size).copy()
+        genetic_algorithm = VectorizedRouteOptimizationGeneticAlgorithm()
+        genetic_algorithm.init(available_coordinates=coordinates, population=population, **options)
+        genetic_algorithm.total_distances = np.frombuffer(sections['total_distances'], dtype=np.float64).copy()
+        genetic_algorithm.fitness_scores = np.frombuffer(sections['fitness_scores'], dtype=np.float64).copy()
+        genetic_algorithm.current_best_population_order = genetic_algorithm.create_population_order(int(np.argmax(genetic_algorithm.fitness_scores)))
+        genetic_algorithm.rng.bit_generator.state = header['random_state']
+
+    # -- Seen fingerprints -- #
+    unique_paths = genetic_algorithm.unique_paths
+    if isinstance(unique_paths, BloomFilter):
+        unique_paths.bits = bytearray(sections['unique_paths'])
+        unique_paths.count = header['unique_paths_count']
+    else:
+        unique_paths.fingerprints.clear()
+        for item in sections['unique_paths']:
+            unique_paths.fingerprints[item] = None
+
+    # -- Stats -- #
+    best = PopulationOrder(sections['best'], do_shuffle=False)
+    best.total_distance = header['best_total_distance']
+    best.fitness_score = header['best_fitness_score']
+    genetic_algorithm.best_population_order = best
+    genetic_algorithm.generation = header['generation']
+    genetic_algorithm.best_generation = header['best_generation']
+    genetic_algorithm.average_fitness = header['average_fitness']
+    genetic_algorithm.evaluations = header['evaluations']
+    return genetic_algorithm
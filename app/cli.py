@@ -0,0 +1,276 @@
+"""
+    Headless Command Line Interface
+
+        python -m app solve coordinates.txt --output best.json
+        python -m app solve --resume run.ckpt --checkpoint run.ckpt
+        python -m app benchmark random:50 random:1000 berlin52.tsp --output results.json
+        python -m app batch jobs.jsonl --workers 4
+        python -m app serve --port 8080
+
+    solve runs the genetic algorithm on coordinates read from a file
+    and writes the best order found with its stats as JSON.
+    benchmark runs it on standard instances (see app.benchmark).
+    batch / serve solve many jobs on a pool of workers (see app.service).
+    Nothing in here imports tkinter or matplotlib.
+"""
+import argparse
+import json
+import sys
+import time
+from app import benchmark, service
+from app.checkpoint import get_checkpoint_callback, load_checkpoint, save_checkpoint
+from app.genetic_algorithm import BACKENDS, CROSSOVER_METHODS, MUTATION_METHODS, REPLACEMENT_METHODS, SELECTION_METHODS, RouteOptimizationGeneticAlgorithm
+from app.loaders import load_file
+from app.local_search import LOCAL_SEARCH_METHODS
+from app.seeding import SEED_STRATEGIES
+from app.stopping import StoppingCriteria
+
+
+def get_columns(value: str) -> tuple:
+    """     "X,Y" field indexes of --columns      """
+    try:
+        x, y = (int(field) for field in value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected two field indexes as X,Y, got {value!r}')
+    return x, y
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m app', description='Genetic Algorithm - Route Optimization')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    # -- solve -- #
+    solve = commands.add_parser('solve', help='find the best order of the coordinates in a file')
+    solve.add_argument('coordinates', nargs='?', help='file with one "x,y" coordinate per line, a TSPLIB .tsp or float32 x,y pairs (.bin / .f32)')
+    solve.add_argument('--columns', type=get_columns, metavar='X,Y', help='fields holding x and y in a CSV coordinates file, e.g. 1,2')
+    solve.add_argument('-o', '--output', help='JSON file to write the result to (default: stdout)')
+    # -- Same inputs as the GUI Options frame -- #
+    solve.add_argument('--population', type=int, default=50, help='population (count)')
+    solve.add_argument('--mutation-rate', type=float, default=1, help='mutation rate (%%)')
+    solve.add_argument('--minimizing-factor', type=float, default=1, help='minimize seen by (factor)')
+    # -- Operators -- #
+    solve.add_argument('--selection', choices=sorted(SELECTION_METHODS), default='roulette')
+    solve.add_argument('--crossover', choices=sorted(CROSSOVER_METHODS), default='half')
+    solve.add_argument('--mutation', choices=sorted(MUTATION_METHODS), default='swap')
+    solve.add_argument('--replacement', choices=sorted(REPLACEMENT_METHODS), default='generational')
+    solve.add_argument('--replacement-rate', type=float, default=0.1, help='fraction of the population replaced per generation (steady_state)')
+    solve.add_argument('--elitism', type=int, default=0, help='fittest population orders carried over unchanged')
+    solve.add_argument('--fitness-cache-max', type=int, default=100000, help='distances of recently walked orders kept (0 disables the cache)')
+    solve.add_argument('--track-diversity', action='store_true', help='edge entropy of the population every generation (in --log)')
+    solve.add_argument('--adaptive', action='store_true', help='raise the mutation rate / lower the selection pressure as the population converges')
+    solve.add_argument('--diversity-target', type=float, default=0.3, help='edge entropy (0-1) below which --adaptive steps in')
+    solve.add_argument('--backend', choices=BACKENDS, default='python', help='numba runs the hot loops as compiled kernels (needs Numba)')
+    solve.add_argument('--local-search', choices=sorted(LOCAL_SEARCH_METHODS), help='memetic refinement of the elites')
+    solve.add_argument('--local-search-elites', type=int, default=1)
+    solve.add_argument('--seed-strategy', choices=sorted(SEED_STRATEGIES), help='construction heuristic seeding part of the initial population')
+    solve.add_argument('--seed-fraction', type=float, default=0.1)
+    solve.add_argument('--seed', type=int, help='seed of the random stream, the same seed and options giving the same run (the seed used is in the result)')
+    # -- Stopping -- #
+    solve.add_argument(
+        '--threshold', type=int, default=100,
+        help='stop after this many generations without improvement, as "Start (Threshold)" (0 runs until interrupted, as "Start (All)")',
+    )
+    solve.add_argument('--max-generations', type=int, default=0, help='stop after this many generations (0 for no limit)')
+    solve.add_argument('--max-evaluations', type=int, default=0, help='stop after this many evaluated orders (0 for no limit)')
+    solve.add_argument('--time-budget', type=float, default=0, help='stop after this many seconds (0 for no limit)')
+    solve.add_argument('--target-distance', type=float, help='stop once the best distance is at or below this')
+    solve.add_argument('--plateau-generations', type=int, default=0, help='stop after this many generations improving by less than --plateau-tolerance')
+    solve.add_argument('--plateau-tolerance', type=float, default=0.001, help='relative improvement ending a plateau')
+    solve.add_argument('--min-diversity', type=float, help='stop once the share of distinct orders in the population is below this')
+    solve.add_argument('--progress', action='store_true', help='print every improvement of the best order to stderr')
+    # -- Checkpoints -- #
+    solve.add_argument('--checkpoint', help='file the state of the run is saved to, to be resumed with --resume')
+    solve.add_argument('--checkpoint-every', type=int, default=100, help='generations between two checkpoints')
+    solve.add_argument('--resume', metavar='CHECKPOINT', help='continue the run saved in a checkpoint (its options replace the ones given)')
+    # -- Instrumentation -- #
+    solve.add_argument('--profile', action='store_true', help='time every phase and count evaluations, added to the result')
+    solve.add_argument('--log', help='JSON lines file, one metrics snapshot per logged generation')
+    solve.add_argument('--log-every', type=int, default=1, help='generations between two snapshots of --log')
+
+    # -- benchmark -- #
+    bench = commands.add_parser('benchmark', help='measure the solver on standard instances')
+    bench.add_argument('instances', nargs='*', default=['random:50', 'random:200', 'random:1000'], help='random:N or a TSPLIB .tsp file')
+    bench.add_argument('--engine', dest='engines', action='append', choices=benchmark.ENGINES, help='repeat to run several engines (default: object)')
+    bench.add_argument('--population', type=int, default=50)
+    bench.add_argument('--generations', type=int, default=200, help='generations per run (0 for no limit)')
+    bench.add_argument('--time-budget', type=float, default=0, help='seconds per run (0 for no limit)')
+    bench.add_argument('--mutation-rate', type=float, default=1, help='mutation rate (%%)')
+    bench.add_argument('--minimizing-factor', type=float, default=1)
+    bench.add_argument('--seed', type=int, default=0)
+    bench.add_argument('--columns', type=get_columns, metavar='X,Y', help='fields holding x and y in CSV instance files, e.g. 1,2')
+    bench.add_argument('--option', dest='options', action='append', default=list(), metavar='NAME=JSON', help="extra init option of the object engine, e.g. --option 'crossover=\"ox\"'")
+    bench.add_argument('-o', '--output', help='JSON file to write the results to')
+    bench.add_argument('--baseline', help='JSON results of a previous run to compare against')
+    bench.add_argument('--tolerance', type=float, default=0.1, help='relative slack before a difference from the baseline is a regression')
+
+    # -- batch -- #
+    batch = commands.add_parser('batch', help='solve every job of a JSON lines file on a pool of workers')
+    batch.add_argument('jobs', help='JSON lines file of jobs (- for stdin)')
+    batch.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    batch.add_argument('-o', '--output', help='JSON lines file of the results, as each job finishes (default: stdout)')
+
+    # -- serve -- #
+    serve = commands.add_parser('serve', help='solve jobs posted to a local HTTP endpoint')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8080)
+    serve.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    return parser
+
+
+def solve(args: argparse.Namespace) -> dict:
+    """     Runs the genetic algorithm until a stopping condition is met (or Ctrl+C)      """
+    started = time.perf_counter()
+    if args.resume:
+        genetic_algorithm = load_checkpoint(args.resume)
+    elif args.coordinates:
+        genetic_algorithm = RouteOptimizationGeneticAlgorithm()
+        genetic_algorithm.init(
+            available_coordinates=load_file(args.coordinates, args.columns),
+            population_size=args.population,
+            mutation_rate=args.mutation_rate / 100,  # Convert % to Decimal
+            minimizing_factor=args.minimizing_factor,
+            selection=args.selection,
+            crossover=args.crossover,
+            mutation=args.mutation,
+            replacement=args.replacement,
+            replacement_rate=args.replacement_rate,
+            elitism=args.elitism,
+            fitness_cache_max=args.fitness_cache_max,
+            backend=args.backend,
+            track_diversity=args.track_diversity,
+            adaptive=args.adaptive,
+            diversity_target=args.diversity_target,
+            local_search=args.local_search,
+            local_search_elites=args.local_search_elites,
+            seed_strategy=args.seed_strategy,
+            seed_fraction=args.seed_fraction,
+            seed=args.seed,
+            profile=args.profile,
+        )
+    else:
+        raise SystemExit('solve: a coordinates file or --resume is required')
+    if args.checkpoint:
+        genetic_algorithm.add_generation_callback(get_checkpoint_callback(args.checkpoint, args.checkpoint_every))
+    log = open(args.log, 'w') if args.log else None
+    if log is not None:
+        genetic_algorithm.add_generation_callback(get_log_callback(log, args.log_every))
+    until = StoppingCriteria(
+        time_budget=args.time_budget,
+        max_generations=args.max_generations,
+        max_evaluations=args.max_evaluations,
+        target_distance=args.target_distance,
+        threshold=args.threshold,
+        plateau_generations=args.plateau_generations,
+        plateau_tolerance=args.plateau_tolerance,
+        min_diversity=args.min_diversity,
+    )
+    try:
+        for best in genetic_algorithm.run(until=until):
+            if args.progress:
+                sys.stderr.write(f'generation {genetic_algorithm.generation}: {best.total_distance:.2f}\n')
+    except KeyboardInterrupt:
+        until.reason = 'interrupted'
+    finally:
+        if log is not None:
+            log.close()
+        # -- Last state, so that an interrupted run can be resumed where it stopped -- #
+        if args.checkpoint:
+            save_checkpoint(genetic_algorithm, args.checkpoint)
+    elapsed = time.perf_counter() - started
+    best = genetic_algorithm.best_population_order
+    result = {
+        'order': list(best.data),
+        'coordinates': genetic_algorithm.get_coordinates(best),
+        'total_distance': best.total_distance,
+        'fitness_score': best.fitness_score,
+        'generations': genetic_algorithm.generation,
+        'best_generation': genetic_algorithm.best_generation,
+        'evaluations': genetic_algorithm.evaluations,
+        'average_fitness': genetic_algorithm.average_fitness,
+        'stop_reason': until.reason,
+        'seed': genetic_algorithm.get_options()['seed'],
+        'elapsed_seconds': elapsed,
+        'generations_per_second': genetic_algorithm.generation / elapsed if elapsed else None,
+    }
+    if genetic_algorithm.fitness_cache is not None:
+        result['fitness_cache'] = genetic_algorithm.fitness_cache.get_stats()
+    if genetic_algorithm.profiler is not None:
+        result['profile'] = genetic_algorithm.profiler.get_snapshot()
+    return result
+
+
+def get_log_callback(log, every: int):
+    """     Generation callback writing the metrics snapshot of every n-th generation as a JSON line      """
+    def write_metrics(genetic_algorithm):
+        if genetic_algorithm.generation % every == 0:
+            log.write(json.dumps(genetic_algorithm.get_metrics()) + '\n')
+    return write_metrics
+
+
+def run_benchmark(args: argparse.Namespace) -> int:
+    """     Prints the report, and returns 1 when there are regressions against the baseline      """
+    if not args.generations and not args.time_budget:
+        raise SystemExit('benchmark: --generations or --time-budget is required')
+    options = dict()
+    for option in args.options:
+        name, value = option.split('=', 1)
+        options[name.replace('-', '_')] = json.loads(value)
+    results = benchmark.run_benchmark(
+        instances=args.instances,
+        engines=args.engines or ['object'],
+        population=args.population,
+        generations=args.generations,
+        time_budget=args.time_budget,
+        mutation_rate=args.mutation_rate / 100,  # Convert % to Decimal
+        minimizing_factor=args.minimizing_factor,
+        seed=args.seed,
+        options=options,
+        columns=args.columns,
+    )
+    print(benchmark.format_report(results))
+    if args.output:
+        benchmark.save(results, args.output)
+    if args.baseline:
+        regressions = benchmark.compare(results, benchmark.load(args.baseline), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        return 1 if regressions else 0
+    return 0
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """     Writes one result line per job as soon as it finishes      """
+    jobs_file = sys.stdin if args.jobs == '-' else open(args.jobs)
+    output = open(args.output, 'w') if args.output else sys.stdout
+    solver = service.BatchSolver(args.workers)
+    try:
+        for result in solver.solve(service.read_jobs(jobs_file)):
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+    finally:
+        solver.close()
+        if jobs_file is not sys.stdin:
+            jobs_file.close()
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+def main(argv: list = None) -> int:
+    args = get_parser().parse_args(argv)
+    if args.command == 'benchmark':
+        return run_benchmark(args)
+    if args.command == 'batch':
+        return run_batch(args)
+    if args.command == 'serve':
+        service.serve(args.host, args.port, args.workers)
+        return 0
+    if args.command == 'solve':
+        result = solve(args)
+        if args.output:
+            with open(args.output, 'w') as file:
+                json.dump(result, file, indent=2)
+        else:
+            json.dump(result, sys.stdout, indent=2)
+            sys.stdout.write('\n')
+    return 0
@@ -0,0 +1,71 @@
+"""
+    Diversity
+
+    Population diversity measured on the connections (edges) of the
+    orders rather than on whole orders: two orders differing by one
+    swap share nearly all their edges, which a unique order count
+    does not see.
+"""
+import math
+from array import array
+
+
+class EdgeStatistics:
+
+    """
+        N x N matrix counting how many orders of the population use
+        each (undirected) connection, kept up to date as orders are
+        added / removed, along with sum(c * log c) over the counts so
+        that the edge entropy is O(1) to read:
+
+            entropy = log(E) - sum(c * log c) / E,   E = edges in total
+
+        get_entropy is normalized to 0 when every order uses the same
+        edges (a converged population) and 1 when no edge is shared.
+    """
+
+    def __init__(self, size: int, max_count: int):
+        self.size = size
+        self.counts = array('I', bytes(4 * size * size))
+        # -- c * log c for every count an edge can reach -- #
+        self.count_log_counts = array('d', [0.0] + [count * math.log(count) for count in range(1, max_count + 1)])
+        self.sum_count_log_count = 0.0
+        self.edges = 0
+        self.orders = 0
+
+    def add(self, data) -> None:
+        """     Counts the edges of one order     """
+        self.update(data, 1)
+
+    def remove(self, data) -> None:
+        """     Uncounts the edges of one order     """
+        self.update(data, -1)
+
+    def update(self, data, step: int) -> None:
+        counts = self.counts
+        count_log_counts = self.count_log_counts
+        size = self.size
+        total = self.sum_count_log_count
+        previous = None
+        for city in data:
+            if previous is not None:
+                edge = previous * size + city if previous < city else city * size + previous
+                count = counts[edge]
+                total += count_log_counts[count + step] - count_log_counts[count]
+                counts[edge] = count + step
+            previous = city
+        self.sum_count_log_count = total
+        self.edges += step * max(len(data) - 1, 0)
+        self.orders += step
+
+    def get_entropy(self) -> float:
+        """     Normalized edge entropy, 0 (converged) to 1 (no shared edge)     """
+        if self.orders < 2 or self.size < 3:
+            return 0.0
+        entropy = math.log(self.edges) - self.sum_count_log_count / self.edges
+        # -- A single order's edges (converged) up to every edge distinct (or every possible edge used) -- #
+        lowest = math.log(self.size - 1)
+        highest = math.log(min(self.edges, self.size * (self.size - 1) // 2))
+        if highest <= lowest:
+            return 0.0
+        return min(max((entropy - lowest) / (highest - lowest), 0.0), 1.0)
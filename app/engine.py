@@ -0,0 +1,105 @@
+"""
+    Engine
+
+    What both genetic algorithm engines (RouteOptimizationGeneticAlgorithm
+    and the NumPy VectorizedRouteOptimizationGeneticAlgorithm) share: the
+    run loop, generation callbacks, instrumentation, metrics and options.
+    An engine implements init and set_next_population, and fills the
+    stats attributes (generation, best_population_order, ...).
+"""
+from app.profiling import Profiler
+from app.stopping import StoppingCriteria
+
+
+class RouteMap:
+
+    """     Holds the coordinates that orders of city indexes refer to     """
+
+    coordinates: list
+
+    def get_coordinates(self, po) -> list:
+        """     Maps a Population Order of city indexes back to (x,y) coordinates     """
+        return [self.coordinates[index] for index in po.data]
+
+
+class Engine(RouteMap):
+
+    # -- Instrumentation (opt-in) -- #
+    profiler: Profiler or None = None
+    generation_callbacks: list
+
+    def init_instrumentation(self, profile: bool) -> None:
+        """     Called at the start of init: a profiler of a previous run is detached first     """
+        if self.profiler is not None:
+            self.profiler.detach(self)
+        self.profiler = None
+        if profile is True:
+            self.profiler = Profiler()
+            self.profiler.attach(self)
+        self.generation_callbacks = list()
+
+    def run(self, until: StoppingCriteria = None):
+        """
+            Evolves until a stopping rule is met (or the caller stops
+            iterating), yielding the best population order first and
+            then every time it improves. The rule met is left in
+            until.reason.
+        """
+        until = StoppingCriteria() if until is None else until
+        until.start()
+        best = self.best_population_order
+        if best is not None:
+            yield best
+        while not until.is_met(self):
+            self.set_next_generation()
+            if self.best_population_order is not best:
+                best = self.best_population_order
+                yield best
+
+    def set_next_generation(self) -> None:
+        """
+            Generates a next generation and then sets the
+            fitness scores / percentages. Generation callbacks
+            are called once the generation is complete.
+        """
+        self.set_next_population()
+        for callback in self.generation_callbacks:
+            callback(self)
+
+    def set_next_population(self) -> None:
+        raise NotImplementedError
+
+    def add_generation_callback(self, callback) -> None:
+        """     callback(genetic_algorithm) is called after every generation     """
+        self.generation_callbacks.append(callback)
+
+    def get_metrics(self) -> dict:
+        """     Snapshot of the run stats (plus get_engine_metrics), with the profiler stats when profiling     """
+        metrics = {
+            'generation': self.generation,
+            'best_generation': self.best_generation,
+            'best_total_distance': self.best_population_order.total_distance if self.best_population_order else None,
+            'current_best_total_distance': self.current_best_population_order.total_distance if self.current_best_population_order else None,
+            'average_fitness': self.average_fitness,
+            'evaluations': self.evaluations,
+        }
+        metrics.update(self.get_engine_metrics())
+        if self.profiler is not None:
+            metrics.update(self.profiler.get_snapshot())
+        return metrics
+
+    def get_engine_metrics(self) -> dict:
+        """     Metrics only an engine has     """
+        return dict()
+
+    def get_options(self) -> dict:
+        """     init options of this run, apart from the coordinates (see app.checkpoint)     """
+        return {
+            'population_size': self.population_size,
+            'minimizing_factor': self.minimizing_factor,
+            'selection': self.selection,
+            'unique_paths_max': self.unique_paths_max,
+            'unique_paths_strategy': self.unique_paths_strategy,
+            'unique_paths_false_positive_rate': self.unique_paths_false_positive_rate,
+            'profile': self.profiler is not None,
+        }
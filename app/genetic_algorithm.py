@@ -15,25 +15,61 @@
                 - add new child to population
             Replace old population with new population
 """
+import bisect
+import heapq
+import itertools
 import math
 import random
+import time
+import warnings
+from array import array
+from app.diversity import EdgeStatistics
+from app.engine import Engine
+from app.loaders import CoordinateArray
+from app.local_search import LOCAL_SEARCH_METHODS, get_neighbour_lists, improve
+from app.randomness import RandomStream
+from app.seeding import SEED_STRATEGIES
+from app.spatial import KDTree
+from app.uniqueness import UNIQUE_PATHS_STRATEGIES, FitnessCache, fingerprint
+
+
+def get_index_typecode(size: int) -> str:
+    """     array typecode of the smallest unsigned integer able to hold size city indexes     """
+    return 'H' if size <= 0x10000 else 'I'
 
 
 class PopulationOrder:
 
-    def __init__(self, source: list, do_shuffle=True):
-        self.data = source[:]
+    """
+        One order of city indexes, stored as a packed array of
+        2 (or 4 when there are more than 65536 cities) bytes per
+        city. __slots__ keeps the per-object overhead fixed so that
+        very large populations fit in memory.
+    """
+
+    __slots__ = ('data', 'fitness_score', 'fitness_score_percent', 'total_distance', 'fingerprint')
+
+    def __init__(self, source, do_shuffle=True, rng=random):
+        # -- Copying an array is a single buffer copy -- #
+        if isinstance(source, array):
+            self.data = source[:]
+        else:
+            source = list(source)
+            self.data = array(get_index_typecode(len(source)), source)
         if do_shuffle is True:
-            random.shuffle(self.data)
+            rng.shuffle(self.data)
         self.fitness_score = 0
         self.fitness_score_percent = None
-        self.total_distance = 0
+        # -- None until the order has been walked -- #
+        self.total_distance = None
+        # -- Set along with the fitness score -- #
+        self.fingerprint = None
 
     def __eq__(self, other):
         return self.data == other.data
 
     def __hash__(self):
-        return hash(repr(self.data))
+        return fingerprint(self.data)
 
     def __gt__(self, other):
         """     Python Implementation for the .order() function      """
@@ -44,21 +80,125 @@ class PopulationOrder:
         return len(self.data)
 
     def create_copy(self):
-        """     Custom Copy Population Order Implementation     """
-        return PopulationOrder(source=self.data.copy(), do_shuffle=False)
+        """
+            Custom Copy Population Order Implementation. The copy
+            carries the total distance, so an unchanged copy never
+            has to be walked again.
+        """
+        po = PopulationOrder(source=self.data, do_shuffle=False)
+        po.total_distance = self.total_distance
+        return po
 
-    def set_fitness_score(self, unique_paths: set, minimizing_factor: float):
+    def set_total_distance(self, distance_matrix: list, route_distance=None):
+        """
+            Data holds city indexes, so the distance of each
+            connection is a lookup in the precomputed distance
+            matrix rather than a square root per connection.
+            route_distance, when given, walks the order instead
+            (compiled kernel, see app.kernels).
+        """
+        if route_distance is not None:
+            self.total_distance = route_distance(self.data)
+            return
         self.total_distance = 0
-        first = None
         previous = None
-        for index in range(len(self.data)):
-            if first is None:
-                first = previous = self.data[index]
-                continue
-            self.total_distance += self.get_relative_distance(*self.data[index], *previous)
-            previous = self.data[index]
-        # self.total_distance += self.get_relative_distance(*previous, *first)
-        self.fitness_score = self.get_fitness_score(total_distance=self.total_distance, is_new=self not in unique_paths, minimizing_factor=minimizing_factor)
+        for index in self.data:
+            if previous is not None:
+                self.total_distance += distance_matrix[previous][index]
+            previous = index
+        # self.total_distance += distance_matrix[previous][self.data[0]]
+
+    def set_fitness_score(self, distance_matrix: list, unique_paths, minimizing_factor: float, fitness_cache=None,
+                          route_distance=None) -> bool:
+        """
+            Walks the order only if its total distance is neither
+            already known nor in fitness_cache. unique_paths holds the
+            fingerprints of the orders seen so far. Returns whether
+            the order is new.
+        """
+        self.fingerprint = fingerprint(self.data)
+        if self.total_distance is None and fitness_cache is not None:
+            self.total_distance = fitness_cache.get(self.fingerprint)
+            if self.total_distance is None:
+                self.set_total_distance(distance_matrix, route_distance)
+                fitness_cache.add(self.fingerprint, self.total_distance)
+        elif self.total_distance is None:
+            self.set_total_distance(distance_matrix, route_distance)
+        is_new = self.fingerprint not in unique_paths
+        self.fitness_score = self.get_fitness_score(total_distance=self.total_distance, is_new=is_new, minimizing_factor=minimizing_factor)
+        return is_new
+
+    # --------------- #
+    # -- MUTATIONS -- #
+    # --------------- #
+    # -- Each mutation returns the change in total distance   -- #
+    # -- it caused, and keeps total_distance up to date when   -- #
+    # -- it is known, by only looking at the connections that  -- #
+    # -- were replaced.                                        -- #
+
+    def swap(self, index1: int, index2: int, distance_matrix: list) -> float:
+        """     Swaps the cities at two positions      """
+        if index1 == index2:
+            return 0
+        index1, index2 = min(index1, index2), max(index1, index2)
+        # -- Connections (by starting position) touching either position -- #
+        last = len(self.data) - 1
+        connections = {index for index in (index1 - 1, index1, index2 - 1, index2) if 0 <= index < last}
+        before = self.get_connections_distance(connections, distance_matrix)
+        self.data[index1], self.data[index2] = self.data[index2], self.data[index1]
+        return self.add_distance_delta(self.get_connections_distance(connections, distance_matrix) - before)
+
+    def reverse(self, index1: int, index2: int, distance_matrix: list) -> float:
+        """     Reverses the cities between two positions (2-opt move)      """
+        index1, index2 = min(index1, index2), max(index1, index2)
+        # -- Distances are symmetric, so only the two outer connections change -- #
+        last = len(self.data) - 1
+        connections = {index for index in (index1 - 1, index2) if 0 <= index < last}
+        before = self.get_connections_distance(connections, distance_matrix)
+        self.data[index1:index2 + 1] = self.data[index1:index2 + 1][::-1]
+        return self.add_distance_delta(self.get_connections_distance(connections, distance_matrix) - before)
+
+    def insert(self, index1: int, index2: int, distance_matrix: list) -> float:
+        """     Moves the city at index1 so that it ends up at index2      """
+        if index1 == index2:
+            return 0
+        size = len(self.data)
+        city = self.data[index1]
+        # -- Close the gap left by the city -- #
+        previous = self.data[index1 - 1] if index1 > 0 else None
+        following = self.data[index1 + 1] if index1 < size - 1 else None
+        delta = (
+            self.get_edge_distance(previous, following, distance_matrix)
+            - self.get_edge_distance(previous, city, distance_matrix)
+            - self.get_edge_distance(city, following, distance_matrix)
+        )
+        self.data.pop(index1)
+        # -- Open a gap for the city at its new position -- #
+        previous = self.data[index2 - 1] if index2 > 0 else None
+        following = self.data[index2] if index2 < size - 1 else None
+        delta += (
+            self.get_edge_distance(previous, city, distance_matrix)
+            + self.get_edge_distance(city, following, distance_matrix)
+            - self.get_edge_distance(previous, following, distance_matrix)
+        )
+        self.data.insert(index2, city)
+        return self.add_distance_delta(delta)
+
+    def get_connections_distance(self, connections: set, distance_matrix: list) -> float:
+        """     Sum of the connections starting at the given positions      """
+        return sum(distance_matrix[self.data[index]][self.data[index + 1]] for index in connections)
+
+    @staticmethod
+    def get_edge_distance(a: int or None, b: int or None, distance_matrix: list) -> float:
+        """     Distance between two cities, 0 if either end of the order was passed     """
+        if a is None or b is None:
+            return 0
+        return distance_matrix[a][b]
+
+    def add_distance_delta(self, delta: float) -> float:
+        if self.total_distance is not None:
+            self.total_distance += delta
+        return delta
 
     def set_fitness_score_percent(self, total: float):
         self.fitness_score_percent = self.fitness_score / total
@@ -86,15 +226,110 @@ class PopulationOrder:
             return 1 / total_distance
 
 
-class RouteOptimizationGeneticAlgorithm:
+# -- Selection name => method of RouteOptimizationGeneticAlgorithm -- #
+SELECTION_METHODS = {
+    'roulette': 'natural_selection',
+    'tournament': 'tournament_selection',
+    'sus': 'stochastic_universal_selection',
+}
+
+# -- CrossOver name => method of RouteOptimizationGeneticAlgorithm -- #
+CROSSOVER_METHODS = {
+    'half': 'crossover_v2',
+    'ox': 'order_crossover',
+    'pmx': 'partially_mapped_crossover',
+    'erx': 'edge_recombination_crossover',
+}
+
+# -- Mutation name => method of PopulationOrder -- #
+MUTATION_METHODS = {
+    'swap': 'swap',
+    'reverse': 'reverse',
+    'insert': 'insert',
+}
+
+# -- Backends running the per population order hot loops -- #
+BACKENDS = ('python', 'numba')
+
+# -- Above this many cities distances are computed on demand rather than precomputed (N x N) -- #
+DENSE_DISTANCE_MATRIX_MAX = 2000
+
+# -- Replacement name => method of RouteOptimizationGeneticAlgorithm -- #
+REPLACEMENT_METHODS = {
+    'generational': 'generational_replacement',
+    'steady_state': 'steady_state_replacement',
+}
+
+
+class OnDemandDistanceMatrix:
+
+    """
+        Stands in for the N x N distance matrix when there are too
+        many cities to precompute it (a dense matrix of 50k cities
+        would take tens of GB). distance_matrix[a][b] computes the
+        distance from the coordinates when looked up, so memory
+        stays O(N) at the cost of a square root per lookup.
+    """
+
+    __slots__ = ('xs', 'ys')
+
+    def __init__(self, coordinates):
+        self.xs = array('d', (x for x, _ in coordinates))
+        self.ys = array('d', (y for _, y in coordinates))
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __getitem__(self, a: int):
+        return OnDemandDistanceRow(self.xs, self.ys, a)
+
+
+class OnDemandDistanceRow:
+
+    """     Distances from one city, see OnDemandDistanceMatrix     """
+
+    __slots__ = ('xs', 'ys', 'x', 'y')
+
+    def __init__(self, xs: array, ys: array, a: int):
+        self.xs = xs
+        self.ys = ys
+        self.x = xs[a]
+        self.y = ys[a]
+
+    def __getitem__(self, b: int) -> float:
+        # -- Same formula as PopulationOrder.get_relative_distance -- #
+        return math.sqrt((self.xs[b] - self.x) ** 2 + (self.ys[b] - self.y) ** 2)
+
+
+def get_fitness_score(po: PopulationOrder) -> float:
+    """     Key function ranking population orders by fitness     """
+    return po.fitness_score
+
+
+class RouteOptimizationGeneticAlgorithm(Engine):
 
     """
         Takes in a list of tuples (x,y coordinates) of routes
-        on a 2 Dimensional space. Then using Genetic Algorithm
+        on a 2 Dimensional space (or a CoordinateArray loaded from
+        a file, see app.loaders). Then using Genetic Algorithm
         (GA), the best path is efficiently chosen.
     """
 
+    # -- Profiler phase name => method timed for that phase -- #
+    PROFILED_PHASES = {
+        'selection': 'select_parents',
+        'crossover': 'crossover_method',
+        'mutation': 'mutation_v3',
+        'fitness': 'evaluate',
+        'fitness_percentages': 'set_fitness_percentages',
+        'local_search': 'refine_elites',
+        'diversity': 'update_diversity',
+    }
+
     # -- Core -- #
+    coordinates: list
+    distance_matrix: list
+    spatial_index: KDTree or None
     population_size: int
     population: list
     generation: int
@@ -105,63 +340,308 @@ class RouteOptimizationGeneticAlgorithm:
     best_generation: int
     current_best_population_order: PopulationOrder or None
     average_fitness: float
+    evaluations: int
 
-    # -- Uniqueness -- #
-    unique_paths: set
+    # -- Uniqueness (bounded set of fingerprints) -- #
+    unique_paths: object
     unique_paths_max: int
+    unique_paths_strategy: str
+    unique_paths_false_positive_rate: float
+
+    # -- Diversity (None unless tracked) / Adaptation -- #
+    edge_statistics: EdgeStatistics or None
+    counted_orders: dict
+    edge_entropy: float or None
+    adaptive: bool
+    diversity_target: float
+    adaptive_mutation_max: float
+    base_mutation_rate: float
+    base_tournament_size: int
+
+    # -- Seeded stream every random draw of the run comes from -- #
+    rng: RandomStream
+
+    # -- Compiled kernels (None for the pure Python backend) -- #
+    backend: str
+    kernels: object
+
+    # -- Distances of the orders walked recently (None when disabled) -- #
+    fitness_cache: FitnessCache or None
+    fitness_cache_max: int
 
     minimizing_factor: float
 
-    def init(self, available_coordinates: list, population_size: int, mutation_rate: float, minimizing_factor: float) -> None:
+    # -- Selection -- #
+    selection: str
+    tournament_size: int
+    cumulative_fitness: list
+
+    # -- CrossOver -- #
+    crossover: str
+    crossover_rate: float
+
+    # -- Mutation -- #
+    mutation: str
+
+    # -- Replacement -- #
+    replacement: str
+    replacement_rate: float
+    elitism: int
+
+    # -- Local Search (memetic stage) -- #
+    local_search: str or None
+    local_search_elites: int
+    local_search_time_budget: float
+    local_search_neighbours: int
+    neighbour_lists: list or None
+
+    # -- Seeding -- #
+    seed_strategy: str or None
+    seed_fraction: float
+
+    def init(self, available_coordinates: list, population_size: int, mutation_rate: float, minimizing_factor: float,
+             selection: str = 'roulette', tournament_size: int = 3, crossover: str = 'half', crossover_rate: float = 1.0,
+             mutation: str = 'swap', unique_paths_max: int = 100000, unique_paths_strategy: str = 'lru',
+             unique_paths_false_positive_rate: float = 0.001, local_search: str = None, local_search_elites: int = 1,
+             local_search_neighbours: int = 8, local_search_time_budget: float = 0.05, seed_strategy: str = None,
+             seed_fraction: float = 0.1, replacement: str = 'generational', replacement_rate: float = 0.1,
+             elitism: int = 0, fitness_cache_max: int = 100000, backend: str = 'python', track_diversity: bool = False,
+             adaptive: bool = False, diversity_target: float = 0.3, adaptive_mutation_max: float = 10.0, seed: int = None, profile: bool = False,
+             population: list = None) -> None:
+        """
+            seed starts the run's random stream, so that the same seed
+            and options give the same run (a new seed is drawn when
+            None, see get_options). population, when given, is a list
+            of already evaluated population orders (e.g. from a
+            checkpoint) to start from instead of a random / seeded one.
+        """
         self.generation = 0
+        # -- Instrumentation -- #
+        self.init_instrumentation(profile)
+        # -- Randomness -- #
+        self.rng = RandomStream(seed)
+        # -- Coordinates / Distances -- #
+        # -- A CoordinateArray (see app.loaders) is kept as is, being compact already -- #
+        self.coordinates = available_coordinates if isinstance(available_coordinates, CoordinateArray) else list(available_coordinates)
+        self.distance_matrix = self.get_distance_matrix(self.coordinates)
+        # -- Backend -- #
+        if backend not in BACKENDS:
+            raise ValueError(f'Unknown backend {backend!r}, expected one of {BACKENDS}')
+        self.backend = backend
+        self.kernels = self.get_kernels() if backend == 'numba' else None
         # -- Inputs -- #
         self.population_size = population_size
         self.mutation_rate = mutation_rate
         # -- Stats -- #
         self.average_fitness = 0
+        self.evaluations = 0
         self.best_population_order = None
         self.best_generation = 0
         self.current_best_population_order = None
         # -- Uniqueness -- #
-        self.unique_paths = set()
+        if unique_paths_strategy not in UNIQUE_PATHS_STRATEGIES:
+            raise ValueError(f'Unknown unique paths strategy {unique_paths_strategy!r}, expected one of {sorted(UNIQUE_PATHS_STRATEGIES)}')
+        self.unique_paths_max = unique_paths_max
+        self.unique_paths_strategy = unique_paths_strategy
+        self.unique_paths_false_positive_rate = unique_paths_false_positive_rate
+        self.unique_paths = UNIQUE_PATHS_STRATEGIES[unique_paths_strategy](unique_paths_max, unique_paths_false_positive_rate)
+
+        # -- Fitness Cache -- #
+        self.fitness_cache_max = fitness_cache_max
+        self.fitness_cache = FitnessCache(fitness_cache_max) if fitness_cache_max > 0 else None
 
         self.minimizing_factor = minimizing_factor
 
+        # -- Selection -- #
+        if selection not in SELECTION_METHODS:
+            raise ValueError(f'Unknown selection {selection!r}, expected one of {sorted(SELECTION_METHODS)}')
+        self.selection = selection
+        self.tournament_size = tournament_size
+        self.cumulative_fitness = list()
+
+        # -- CrossOver -- #
+        if crossover not in CROSSOVER_METHODS:
+            raise ValueError(f'Unknown crossover {crossover!r}, expected one of {sorted(CROSSOVER_METHODS)}')
+        self.crossover = crossover
+        self.crossover_rate = crossover_rate
+
+        # -- Mutation -- #
+        if mutation not in MUTATION_METHODS:
+            raise ValueError(f'Unknown mutation {mutation!r}, expected one of {sorted(MUTATION_METHODS)}')
+        self.mutation = mutation
+
+        # -- Replacement -- #
+        if replacement not in REPLACEMENT_METHODS:
+            raise ValueError(f'Unknown replacement {replacement!r}, expected one of {sorted(REPLACEMENT_METHODS)}')
+        if not 0 <= elitism < population_size:
+            raise ValueError(f'elitism must be between 0 and population_size - 1, got {elitism}')
+        self.replacement = replacement
+        self.replacement_rate = replacement_rate
+        self.elitism = elitism
+
+        # -- Local Search -- #
+        if local_search is not None and local_search not in LOCAL_SEARCH_METHODS:
+            raise ValueError(f'Unknown local search {local_search!r}, expected one of {sorted(LOCAL_SEARCH_METHODS)}')
+        self.local_search = local_search
+        self.local_search_elites = local_search_elites
+        self.local_search_time_budget = local_search_time_budget
+        self.local_search_neighbours = local_search_neighbours
+        self.neighbour_lists = None
+
+        # -- Seeding -- #
+        if seed_strategy is not None and seed_strategy not in SEED_STRATEGIES:
+            raise ValueError(f'Unknown seed strategy {seed_strategy!r}, expected one of {sorted(SEED_STRATEGIES)}')
+        self.seed_strategy = seed_strategy
+        self.seed_fraction = seed_fraction
+
+        # -- Diversity / Adaptation (adapting needs the diversity tracked) -- #
+        self.adaptive = adaptive
+        self.diversity_target = diversity_target
+        self.adaptive_mutation_max = adaptive_mutation_max
+        self.base_mutation_rate = mutation_rate
+        self.base_tournament_size = tournament_size
+        self.edge_statistics = None
+        self.counted_orders = dict()
+        self.edge_entropy = None
+        if track_diversity is True or adaptive is True:
+            self.edge_statistics = EdgeStatistics(len(self.coordinates), population_size)
+
+        # -- Spatial Index (only built when something needs it) -- #
+        self.spatial_index = None
+        if local_search is not None or seed_strategy is not None:
+            self.spatial_index = KDTree(self.coordinates)
+        if local_search is not None:
+            self.neighbour_lists = get_neighbour_lists(self.coordinates, self.spatial_index, local_search_neighbours)
+
         # -- Initial Population -- #
-        self.population = self.init_population(available_coordinates)
+        if population is not None:
+            self.population = self.set_fitness_percentages(population)
+        else:
+            self.population = self.init_population()
+        self.set_diversity()
+
+    def get_kernels(self):
+        """
+            Compiled kernels over the distance matrix. Without Numba
+            (or NumPy) the run carries on with the pure Python backend.
+        """
+        try:
+            from app.kernels import IS_COMPILED, Kernels
+        except ImportError:
+            IS_COMPILED = False
+        if not IS_COMPILED:
+            warnings.warn('Numba is not installed, the pure Python backend is used instead')
+            return None
+        if isinstance(self.distance_matrix, OnDemandDistanceMatrix):
+            warnings.warn(f'The numba backend needs the N x N distance matrix, not built above {DENSE_DISTANCE_MATRIX_MAX} cities: the pure Python backend is used instead')
+            return None
+        return Kernels(self.distance_matrix)
+
+    def get_options(self) -> dict:
+        """     init options of this run, apart from the coordinates (see app.checkpoint)     """
+        return {
+            **super().get_options(),
+            # -- As configured, not as adapted -- #
+            'mutation_rate': self.base_mutation_rate,
+            'tournament_size': self.base_tournament_size,
+            'crossover': self.crossover,
+            'crossover_rate': self.crossover_rate,
+            'mutation': self.mutation,
+            'fitness_cache_max': self.fitness_cache_max,
+            'backend': self.backend,
+            'track_diversity': self.edge_statistics is not None,
+            'adaptive': self.adaptive,
+            'diversity_target': self.diversity_target,
+            'adaptive_mutation_max': self.adaptive_mutation_max,
+            'seed': self.rng.initial_seed,
+            'local_search': self.local_search,
+            'local_search_elites': self.local_search_elites,
+            'local_search_neighbours': self.local_search_neighbours,
+            'local_search_time_budget': self.local_search_time_budget,
+            'seed_strategy': self.seed_strategy,
+            'seed_fraction': self.seed_fraction,
+            'replacement': self.replacement,
+            'replacement_rate': self.replacement_rate,
+            'elitism': self.elitism,
+        }
 
     # -------------------- #
     # -- INITIALIZATION -- #
     # -------------------- #
 
-    def init_population(self, available_coordinates: list) -> list:
+    @staticmethod
+    def get_distance_matrix(coordinates: list) -> list or OnDemandDistanceMatrix:
+        """
+            Builds the N x N matrix of distances between every
+            pair of coordinates. Distances are symmetric, so each
+            pair is only calculated once. Above
+            DENSE_DISTANCE_MATRIX_MAX cities (e.g. large files read by
+            app.loaders) distances are computed on demand instead.
         """
-            Takes available coordinates and generates a population
-            of population_size with each element being in
-            shuffled/random order initially.
+        size = len(coordinates)
+        if size > DENSE_DISTANCE_MATRIX_MAX:
+            return OnDemandDistanceMatrix(coordinates)
+        distance_matrix = [[0.0] * size for _ in range(size)]
+        for a in range(size):
+            row = distance_matrix[a]
+            for b in range(a + 1, size):
+                distance = PopulationOrder.get_relative_distance(*coordinates[a], *coordinates[b])
+                row[b] = distance
+                distance_matrix[b][a] = distance
+        return distance_matrix
+
+    def init_population(self) -> list:
         """
+            Generates a population of population_size with each
+            element being a shuffled/random order of city indexes,
+            apart from the seed_fraction seeded by seed_strategy.
+        """
+        city_indexes = array(get_index_typecode(len(self.coordinates)), range(len(self.coordinates)))
         population = list()
-        for i in range(self.population_size):
-            population_order = PopulationOrder(available_coordinates, do_shuffle=True)
-            population_order.set_fitness_score(self.unique_paths, self.minimizing_factor)
-            self.unique_paths.add(population_order)
+        for population_order in self.get_seeded_orders():
+            self.evaluate(population_order)
+            population.append(population_order)
+        for i in range(self.population_size - len(population)):
+            population_order = PopulationOrder(city_indexes, do_shuffle=True, rng=self.rng)
+            self.evaluate(population_order)
             population.append(population_order)
         population = self.set_fitness_percentages(population)
         return population
 
+    def get_seeded_orders(self) -> list:
+        """
+            seed_fraction of the population built by seed_strategy.
+            Nearest neighbour starts each order from a random city;
+            the other strategies always build the same order, so
+            every copy after the first is mutated to keep diversity.
+        """
+        if self.seed_strategy is None or not self.coordinates:
+            return list()
+        count = min(self.population_size, int(round(self.population_size * self.seed_fraction)))
+        build = SEED_STRATEGIES[self.seed_strategy]
+        seeded = list()
+        for i in range(count):
+            if self.seed_strategy == 'nearest_neighbour':
+                start = self.rng.randrange(len(self.coordinates))
+                seeded.append(PopulationOrder(build(self.coordinates, self.spatial_index, start), do_shuffle=False))
+            elif i == 0:
+                seeded.append(PopulationOrder(build(self.coordinates, self.spatial_index), do_shuffle=False))
+            else:
+                seeded.append(self.mutation_v3(seeded[0].create_copy()))
+        return seeded
+
     # ------------------------ #
     # -- Next Generation(s) -- #
     # ------------------------ #
 
-    def set_next_generation(self) -> None:
-        """
-            Generates a next generation and then sets the
-            fitness scores / percentages.
-        """
+    def set_next_population(self) -> None:
         self.current_best_population_order = None
         new_population = self.generate_next()
+        if self.local_search is not None:
+            self.refine_elites(new_population)
         new_population = self.set_fitness_percentages(new_population)
         self.population = new_population
+        self.set_diversity()
 
     def generate_next(self) -> list:
         """
@@ -171,46 +651,140 @@ class RouteOptimizationGeneticAlgorithm:
                     process mixes the populations half/half (or relative if odd).
                 - Mutation randomly swaps two items if a randomly generated float is lower
                     then the mutation rate.
+            The configured replacement decides which population orders
+            the children take the place of.
         """
 
         # -- Up Generation Count -- #
         self.generation += 1
+        return getattr(self, REPLACEMENT_METHODS[self.replacement])()
+
+    def generational_replacement(self) -> list:
+        """
+            Children replace the whole population, apart from the
+            elitism fittest population orders which are carried over
+            unchanged (and are not evaluated again).
+        """
+        elites = heapq.nlargest(self.elitism, self.population, key=get_fitness_score) if self.elitism else list()
+        return elites + self.breed(self.population_size - len(elites))
+
+    def steady_state_replacement(self) -> list:
+        """
+            Only the replacement_rate least fit population orders are
+            replaced by children, found by a partial selection rather
+            than a sort. The elitism fittest are never replaced.
+        """
+        count = min(max(1, int(round(self.population_size * self.replacement_rate))), self.population_size - self.elitism)
+        children = self.breed(count)
+        population = self.population
+        worst = heapq.nsmallest(count, range(len(population)), key=lambda index: population[index].fitness_score)
+        for index, po in zip(worst, children):
+            population[index] = po
+        return population
+
+    def breed(self, count: int) -> list:
+        """     count evaluated children of parents drawn from the current population     """
         # -- Iterate through population count to begin  -- #
         # -- evolution cycle.                           -- #
-        new_population = list()
-        for index in range(self.population_size):
+        # -- Natural Selection (both parents of every child in one draw) -- #
+        parents = self.select_parents(2 * count)
+        # -- Crossover decisions of every child in one block -- #
+        crossover_draws = self.rng.get_uniforms(count) if self.crossover_rate < 1 else None
+        children = list()
+        for index in range(count):
             # -- CONTEXT: Population Order (PO) -- #
-            # -- Natural Selection -- #
-            po_a = self.natural_selection(self.population).create_copy()
-            po_b = self.natural_selection(self.population).create_copy()
-            # -- CrossOver -- #
-            po = self.crossover_v2(po_a, po_b)
+            po_a = parents[index].create_copy()
+            po_b = parents[count + index]
+            # -- CrossOver (otherwise the child is a copy of the first parent) -- #
+            if crossover_draws is None or crossover_draws[index] < self.crossover_rate:
+                po = self.crossover_method(po_a, po_b)
+            else:
+                po = po_a
             # -- Mutation -- #
             po = self.mutation_v3(po)
             # -- Set fitness percentages -- #
-            po.set_fitness_score(self.unique_paths, self.minimizing_factor)
-            self.unique_paths.add(po)
+            self.evaluate(po)
             # -- Add to new population -- #
-            new_population.append(po)
-        return new_population
+            children.append(po)
+        return children
 
-    @staticmethod
-    def natural_selection(population: list) -> PopulationOrder:
+    def refine_elites(self, population: list) -> None:
         """
-            Population list is sorted in ascending order of fitness score
-            percentages. If the random_float falls under a given population
-            orders percentage start/end, then it matched that population
-            order.
+            Memetic stage: the local_search_elites shortest orders of
+            the population are improved with the configured local
+            search, within local_search_time_budget seconds in total.
         """
-        # -- Random Float 0-1 to represent 0 - 100 % -- #
-        random_float = random.uniform(0, 1)
-        # -- CONTEXT: Population Order (PO) -- #
-        fitness_start = 0
-        for po in population:
-            fitness_end = fitness_start + po.fitness_score_percent
-            if fitness_start <= random_float <= fitness_end:
-                return po
-            fitness_start = fitness_end
+        deadline = time.perf_counter() + self.local_search_time_budget
+        for po in heapq.nsmallest(self.local_search_elites, population, key=lambda po: po.total_distance):
+            if time.perf_counter() > deadline:
+                break
+            po.data, delta = improve(po.data, self.distance_matrix, self.neighbour_lists, self.local_search, deadline)
+            if delta < 0:
+                po.total_distance += delta
+                self.evaluate(po)
+
+    def select_parents(self, count: int) -> list:
+        """     Draws count parents using the configured selection method     """
+        return getattr(self, SELECTION_METHODS[self.selection])(count)
+
+    def natural_selection(self, count: int) -> list:
+        """
+            Roulette wheel. Each random float 0-1 is matched to the
+            population order whose fitness percentage start/end it
+            falls under, using a binary search over the cumulative
+            fitness percentages set by set_fitness_percentages.
+        """
+        last = len(self.population) - 1
+        return [
+            self.population[min(bisect.bisect_right(self.cumulative_fitness, draw), last)]
+            for draw in self.rng.get_uniforms(count)
+        ]
+
+    def tournament_selection(self, count: int) -> list:
+        """
+            Each parent is the fittest of tournament_size population
+            orders picked uniformly at random.
+        """
+        population = self.population
+        contestants = self.rng.get_indexes(count * self.tournament_size, len(population))
+        return [
+            max((population[i] for i in contestants[start:start + self.tournament_size]), key=get_fitness_score)
+            for start in range(0, len(contestants), self.tournament_size)
+        ]
+
+    def stochastic_universal_selection(self, count: int) -> list:
+        """
+            Stochastic Universal Sampling. A single random offset
+            places count evenly spaced pointers over the cumulative
+            fitness percentages, so every population order is picked
+            close to its expected number of times. The result is
+            shuffled so that parents are not paired by fitness.
+        """
+        last = len(self.population) - 1
+        step = 1 / count
+        offset = self.rng.random() * step
+        selected = list()
+        index = 0
+        for pointer in range(count):
+            position = offset + pointer * step
+            while index < last and self.cumulative_fitness[index] < position:
+                index += 1
+            selected.append(self.population[index])
+        self.rng.shuffle(selected)
+        return selected
+
+    def crossover_method(self, po_a: PopulationOrder, po_b: PopulationOrder) -> PopulationOrder:
+        """
+            Combines two parents using the configured crossover
+            method. The child is a new order, so its total distance
+            has to be walked again.
+        """
+        if self.kernels is not None and self.crossover == 'half':
+            po = self.kernels.crossover_v2(po_a, po_b)
+        else:
+            po = getattr(self, CROSSOVER_METHODS[self.crossover])(po_a, po_b)
+        po.total_distance = None
+        return po
 
     @staticmethod
     def crossover_v2(po_a: PopulationOrder, po_b: PopulationOrder) -> PopulationOrder:
@@ -227,47 +801,210 @@ class RouteOptimizationGeneticAlgorithm:
         mid_point = int(len(po_a)/2)
         # -- First half of First Population -- #
         new_data = po_a.data[:mid_point]
+        # -- Mark cities already used, indexed by city -- #
+        used = bytearray(len(po_a))
+        for i in new_data:
+            used[i] = 1
         # -- Second Half of Second Population -- #
-        new_data += [
-            i for i in po_b.data if i not in new_data
-        ]
+        new_data.extend(
+            i for i in po_b.data if not used[i]
+        )
         # -- Set and Return -- #
         po_a.data = new_data
         return po_a
 
+    def order_crossover(self, po_a: PopulationOrder, po_b: PopulationOrder) -> PopulationOrder:
+        """
+            Order CrossOver (OX)
+                - Copy a random slice of the first population
+                - Fill the remaining positions, starting after the
+                  slice and wrapping around, with the cities of the
+                  second population in the order they appear from
+                  the same position.
+        """
+        size = len(po_a)
+        start, end = sorted(self.rng.sample(range(size + 1), 2))
+        new_data = po_a.data[:]
+        used = bytearray(size)
+        for i in po_a.data[start:end]:
+            used[i] = 1
+        position = end % size
+        for offset in range(size):
+            i = po_b.data[(end + offset) % size]
+            if used[i]:
+                continue
+            new_data[position] = i
+            position = (position + 1) % size
+        po_a.data = new_data
+        return po_a
+
+    def partially_mapped_crossover(self, po_a: PopulationOrder, po_b: PopulationOrder) -> PopulationOrder:
+        """
+            Partially Mapped CrossOver (PMX)
+                - Copy a random slice of the first population
+                - Cities of the second population's slice that were
+                  not copied follow the slice mapping until they
+                  land on a position outside of the slice
+                - Remaining positions are taken from the second
+                  population as is.
+        """
+        size = len(po_a)
+        start, end = sorted(self.rng.sample(range(size + 1), 2))
+        new_data = po_b.data[:]
+        used = bytearray(size)
+        position_b = [0] * size
+        for index, i in enumerate(po_b.data):
+            position_b[i] = index
+        for index in range(start, end):
+            used[po_a.data[index]] = 1
+        for index in range(start, end):
+            i = po_b.data[index]
+            if used[i]:
+                continue
+            position = index
+            while start <= position < end:
+                position = position_b[po_a.data[position]]
+            new_data[position] = i
+        new_data[start:end] = po_a.data[start:end]
+        po_a.data = new_data
+        return po_a
+
+    def edge_recombination_crossover(self, po_a: PopulationOrder, po_b: PopulationOrder) -> PopulationOrder:
+        """
+            Edge Recombination CrossOver (ERX)
+                - Build the neighbours of every city in both populations
+                - Starting from the first city of the first population,
+                  always move to the unused neighbour that itself has
+                  the fewest unused neighbours left, or to a random
+                  unused city when there is none.
+        """
+        size = len(po_a)
+        neighbours = [set() for _ in range(size)]
+        for data in (po_a.data, po_b.data):
+            for index in range(size - 1):
+                neighbours[data[index]].add(data[index + 1])
+                neighbours[data[index + 1]].add(data[index])
+        # -- Unused cities, with their position for O(1) removal -- #
+        unused = list(range(size))
+        unused_position = list(range(size))
+
+        def use(city):
+            position = unused_position[city]
+            last = unused[-1]
+            unused[position] = last
+            unused_position[last] = position
+            unused.pop()
+            for neighbour in neighbours[city]:
+                neighbours[neighbour].discard(city)
+
+        new_data = array(po_a.data.typecode, po_a.data[:1])
+        use(new_data[0])
+        while unused:
+            candidates = neighbours[new_data[-1]]
+            if candidates:
+                fewest = min(len(neighbours[i]) for i in candidates)
+                city = self.rng.choice([i for i in candidates if len(neighbours[i]) == fewest])
+            else:
+                city = self.rng.choice(unused)
+            new_data.append(city)
+            use(city)
+        po_a.data = new_data
+        return po_a
+
     def mutation_v3(self, po: PopulationOrder) -> PopulationOrder:
         """
             For the length of coordinates in a given population,
             perform the following operations:
                 - Generate a random float 0-1
                 - - if the number is lower then the mutation_rate,
-                - - - then swap two random coordinates.
+                - - - then apply the configured mutation (swap by
+                      default) to two random positions.
+            Rather than one draw per position, the number of positions
+            under the mutation_rate is drawn by skipping ahead to each
+            of them (RandomStream.get_success_count), then the indexes
+            of every mutation in one block.
+            Mutations update the total distance from the connections
+            they replace, so a mutated copy is not walked again.
         """
         # -- CONTEXT: Population Order (PO) -- #
-        # -- Perform this random probability swap a -- #
-        # -- number of times equal to the number of -- #
-        # -- coordinates.                           -- #
-        for i in range(len(po)):
-            # -- If random float is smaller then mutation rate provided -- #
-            if random.uniform(0, 1) <= self.mutation_rate:
-                # -- Generate random indexes to swap -- #
-                index1 = random.randint(0, len(po) - 1)
-                index2 = random.randint(0, len(po) - 1)
-                # -- Traditional Swap method -- #
-                tmp = po.data[index1]
-                po.data[index1] = po.data[index2]
-                po.data[index2] = tmp
+        # -- Number of coordinates drawn under the mutation rate -- #
+        count = self.rng.get_success_count(len(po), self.mutation_rate)
+        if count == 0:
+            return po
+        # -- Generate random indexes to mutate (for either backend) -- #
+        indexes = self.rng.get_indexes(2 * count, len(po))
+        if self.kernels is not None:
+            return self.kernels.mutation_v3(po, indexes, self.mutation)
+        mutate = getattr(po, MUTATION_METHODS[self.mutation])
+        for index in range(count):
+            mutate(indexes[2 * index], indexes[2 * index + 1], self.distance_matrix)
         return po
 
+    # --------------- #
+    # -- MIGRATION -- #
+    # --------------- #
+
+    def get_best_orders(self, count: int) -> list:
+        """     The count fittest population orders, sorted lowest to highest     """
+        return heapq.nlargest(count, self.population, key=get_fitness_score)[::-1]
+
+    def add_immigrants(self, orders: list) -> None:
+        """
+            Replaces the least fit population orders with orders of
+            city indexes coming from another population.
+        """
+        population = self.population
+        worst = heapq.nsmallest(len(orders), range(len(population)), key=lambda index: population[index].fitness_score)
+        for index, data in zip(worst, orders):
+            po = PopulationOrder(data, do_shuffle=False)
+            self.evaluate(po)
+            population[index] = po
+        self.population = self.set_fitness_percentages(self.population)
+        self.set_diversity()
+
     # ------------ #
     # -- SHARED -- #
     # ------------ #
 
+    def get_diversity(self) -> float:
+        """     Share of distinct orders in the population (1 when every order differs)     """
+        return len({po.fingerprint for po in self.population}) / len(self.population)
+
+    def get_engine_metrics(self) -> dict:
+        """     Diversity / adaptation (when tracked) and fitness cache stats     """
+        metrics = dict()
+        if self.edge_statistics is not None:
+            metrics.update(
+                edge_entropy=self.edge_entropy,
+                unique_ratio=self.get_diversity(),
+                mutation_rate=self.mutation_rate,
+                tournament_size=self.tournament_size,
+            )
+        if self.fitness_cache is not None:
+            metrics['fitness_cache'] = self.fitness_cache.get_stats()
+        return metrics
+
+    def evaluate(self, po: PopulationOrder) -> bool:
+        """
+            Sets the fitness score of a population order and remembers
+            it as seen. Every evaluation goes through here, so they all
+            share the fitness cache.
+        """
+        is_new = po.set_fitness_score(
+            self.distance_matrix, self.unique_paths, self.minimizing_factor, self.fitness_cache,
+            self.kernels.route_distance if self.kernels is not None else None,
+        )
+        self.evaluations += 1
+        self.unique_paths.add(po.fingerprint)
+        return is_new
+
     def set_fitness_percentages(self, population: list) -> list:
         """
             (1) Calculates the total Fitness of each order of coordinates
             (2) For each order of coordinates, set the fitness percent using the total fitness
-            (3) Order population by Fitness Score
+            (3) Cumulative fitness percentages for selection
+            The population is not sorted, the fittest / least fit orders
+            are found by partial selection where needed (heapq).
         """
         # -- Calculate total Fitness -- #
         total_fitness_score = sum(
@@ -289,6 +1026,45 @@ class RouteOptimizationGeneticAlgorithm:
                 self.current_best_population_order = po
             # -- GLOBALS: Average Fitness -- #
             self.average_fitness = (self.average_fitness + po.fitness_score) / 2
-        # -- Sort by fitness lower to highest -- #
-        population.sort()
+        # -- Cumulative fitness percentages for selection -- #
+        self.cumulative_fitness = list(itertools.accumulate(po.fitness_score_percent for po in population))
         return population
+
+    # --------------- #
+    # -- DIVERSITY -- #
+    # --------------- #
+
+    def set_diversity(self) -> None:
+        """     Updates the diversity metrics of the population and adapts to them, when tracked     """
+        if self.edge_statistics is None:
+            return
+        self.update_diversity()
+        if self.adaptive is True:
+            self.adapt()
+
+    def update_diversity(self) -> None:
+        """
+            Only the orders that left / joined the population since
+            the last update change the edge counts. Orders are told
+            apart by their data array: every population order owns
+            its array, and local search assigns a new one.
+        """
+        orders = {id(po.data): po.data for po in self.population}
+        for key in self.counted_orders.keys() - orders.keys():
+            self.edge_statistics.remove(self.counted_orders[key])
+        for key in orders.keys() - self.counted_orders.keys():
+            self.edge_statistics.add(orders[key])
+        self.counted_orders = orders
+        self.edge_entropy = self.edge_statistics.get_entropy()
+
+    def adapt(self) -> None:
+        """
+            Below diversity_target (edge entropy), the mutation rate
+            rises linearly up to adaptive_mutation_max times the
+            configured rate and the tournament shrinks down to 2 (less
+            selection pressure). At or above it, both are as configured.
+            Roulette / SUS selection have no pressure setting to adapt.
+        """
+        shortfall = max(0.0, 1 - self.edge_entropy / self.diversity_target) if self.diversity_target > 0 else 0.0
+        self.mutation_rate = min(1.0, self.base_mutation_rate * (1 + (self.adaptive_mutation_max - 1) * shortfall))
+        self.tournament_size = max(2, round(self.base_tournament_size - (self.base_tournament_size - 2) * shortfall))
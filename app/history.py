@@ -0,0 +1,51 @@
+"""
+    History
+
+    Fixed size buffers of per-generation stats for the graphs.
+"""
+from array import array
+
+
+class HistoryBuffer:
+
+    """
+        Preallocated columns of floats holding at most capacity rows.
+        When the buffer is full every other row is dropped and from
+        then on only every stride-th appended row is kept, so a run of
+        any length is covered evenly with bounded memory.
+    """
+
+    def __init__(self, capacity: int = 2048, columns: int = 2):
+        # -- Even capacity, so downsampling halves it exactly -- #
+        self.capacity = capacity + capacity % 2
+        self.columns = [array('d', bytes(8 * self.capacity)) for _ in range(columns)]
+        self.size = 0
+        self.stride = 1
+        self.skipped = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, *values: float) -> None:
+        """     Adds one row (one value per column)     """
+        self.skipped += 1
+        if self.skipped < self.stride:
+            return
+        self.skipped = 0
+        if self.size == self.capacity:
+            self.downsample()
+        for column, value in zip(self.columns, values):
+            column[self.size] = value
+        self.size += 1
+
+    def downsample(self) -> None:
+        """     Keeps every other row and doubles the stride     """
+        half = self.size // 2
+        for column in self.columns:
+            column[:half] = column[0:self.size:2]
+        self.size = half
+        self.stride *= 2
+
+    def get(self, column: int) -> array:
+        """     Copy of the rows of one column     """
+        return self.columns[column][:self.size]
@@ -0,0 +1,159 @@
+"""
+    Island Model
+
+    Runs K independent RouteOptimizationGeneticAlgorithm populations
+    (islands), each in its own process. Every migration_interval
+    generations each island sends copies of its best orders to the
+    islands its topology points at, where they replace the least fit
+    population orders.
+
+    Orders travel between processes as compact arrays of city
+    indexes rather than pickled PopulationOrder objects.
+
+    Every island runs its own random stream, a child of the model's
+    seed, so a seeded model is reproducible.
+"""
+import multiprocessing
+from app.engine import RouteMap
+from app.genetic_algorithm import PopulationOrder, RouteOptimizationGeneticAlgorithm
+from app.loaders import CoordinateArray
+from app.randomness import RandomStream, get_child_seeds
+
+
+# -- Topology name => function(island, islands, rng) returning the destination islands -- #
+TOPOLOGIES = {
+    'ring': lambda island, islands, rng: [(island + 1) % islands],
+    'fully_connected': lambda island, islands, rng: [i for i in range(islands) if i != island],
+    'random': lambda island, islands, rng: [rng.choice([i for i in range(islands) if i != island])],
+}
+
+
+def run_island(connection, options: dict) -> None:
+    """
+        Island process. Waits for commands from the IslandModel:
+            ('evolve', generations, immigrants) => (generation, best_generation, emigrants)
+            ('stop',)
+        Emigrants are sent as (total_distance, PopulationOrder.data) tuples,
+        data being a packed array of city indexes.
+    """
+    migration_size = options.pop('migration_size')
+    genetic_algorithm = RouteOptimizationGeneticAlgorithm()
+    genetic_algorithm.init(**options)
+    while True:
+        command = connection.recv()
+        if command[0] == 'stop':
+            break
+        _, generations, immigrants = command
+        if immigrants:
+            genetic_algorithm.add_immigrants(immigrants)
+        for _ in range(generations):
+            genetic_algorithm.set_next_generation()
+        # -- Best overall order first, then the fittest of this generation -- #
+        best = genetic_algorithm.best_population_order
+        emigrants = [(best.total_distance, best.data)]
+        for po in reversed(genetic_algorithm.get_best_orders(migration_size)):
+            if len(emigrants) >= migration_size:
+                break
+            if po is not best:
+                emigrants.append((po.total_distance, po.data))
+        connection.send((genetic_algorithm.generation, genetic_algorithm.best_generation, emigrants))
+    connection.close()
+
+
+class IslandModel(RouteMap):
+
+    """
+        Coordinates the island processes and keeps the overall
+        best order found by any island.
+    """
+
+    # -- Core -- #
+    coordinates: list
+    islands: int
+    migration_interval: int
+    migration_size: int
+    topology: str
+    generation: int
+    rng: RandomStream
+
+    # -- STATS -- #
+    best_population_order: PopulationOrder or None
+    best_generation: int
+    best_island: int or None
+
+    def __init__(self):
+        self.processes = list()
+        self.connections = list()
+        self.immigrants = list()
+
+    def init(self, available_coordinates: list, islands: int, population_size: int, mutation_rate: float,
+             minimizing_factor: float, migration_interval: int = 50, migration_size: int = 2,
+             topology: str = 'ring', seed: int = None, **options) -> None:
+        """
+            Starts one process per island. Extra options are passed to
+            RouteOptimizationGeneticAlgorithm.init of every island,
+            each island being seeded with its own child seed of seed.
+        """
+        if topology not in TOPOLOGIES:
+            raise ValueError(f'Unknown topology {topology!r}, expected one of {sorted(TOPOLOGIES)}')
+        self.coordinates = available_coordinates if isinstance(available_coordinates, CoordinateArray) else list(available_coordinates)
+        self.islands = islands
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+        self.topology = topology
+        self.generation = 0
+        self.rng = RandomStream(seed)
+        self.best_population_order = None
+        self.best_generation = 0
+        self.best_island = None
+
+        options.update(
+            available_coordinates=self.coordinates,
+            population_size=population_size,
+            mutation_rate=mutation_rate,
+            minimizing_factor=minimizing_factor,
+            migration_size=migration_size,
+        )
+        self.close()
+        for island_seed in get_child_seeds(self.rng.initial_seed, islands):
+            parent_connection, child_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=run_island, args=(child_connection, dict(options, seed=island_seed)), daemon=True)
+            process.start()
+            child_connection.close()
+            self.processes.append(process)
+            self.connections.append(parent_connection)
+        self.immigrants = [list() for _ in range(islands)]
+
+    def set_next_epoch(self) -> None:
+        """
+            Evolves every island for migration_interval generations
+            in parallel, then routes each island's emigrants to its
+            destinations for the next epoch.
+        """
+        for connection, immigrants in zip(self.connections, self.immigrants):
+            connection.send(('evolve', self.migration_interval, immigrants))
+        self.immigrants = [list() for _ in range(self.islands)]
+        for island, connection in enumerate(self.connections):
+            generation, best_generation, emigrants = connection.recv()
+            self.generation = generation
+            # -- GLOBALS: Best Population by Total Distance -- #
+            total_distance, data = emigrants[0]
+            if self.best_population_order is None or total_distance < self.best_population_order.total_distance:
+                self.best_population_order = PopulationOrder(data, do_shuffle=False)
+                self.best_population_order.total_distance = total_distance
+                self.best_generation = best_generation
+                self.best_island = island
+            # -- Migration -- #
+            if self.islands > 1:
+                for destination in TOPOLOGIES[self.topology](island, self.islands, self.rng):
+                    self.immigrants[destination].extend(data for _, data in emigrants)
+
+    def close(self) -> None:
+        """     Stops every island process     """
+        for connection in self.connections:
+            connection.send(('stop',))
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.processes = list()
+        self.connections = list()
@@ -0,0 +1,188 @@
+"""
+    Compiled Kernels
+
+    The per population order hot loops of RouteOptimizationGeneticAlgorithm
+    (walking an order, the half/half crossover and the mutations), written
+    over NumPy arrays of city indexes and a NumPy distance matrix so that
+    Numba can compile them to machine code. cache=True keeps the compiled
+    code in __pycache__, so only the first run pays for the compilation.
+
+    Kernels draw no random numbers: the mutation indexes come from the
+    genetic algorithm's own stream (see app.randomness), so a run is
+    reproducible, checkpointable and unaffected by other runs of the
+    same process whichever backend it uses.
+
+    Numba (and NumPy) are optional: IS_COMPILED is False when Numba is not
+    installed, in which case the genetic algorithm keeps its pure Python
+    implementation (see the backend init option).
+"""
+from array import array
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+IS_COMPILED = numba is not None
+
+# -- Mutation name => code of the mutation in mutate -- #
+MUTATION_CODES = {
+    'swap': 0,
+    'reverse': 1,
+    'insert': 2,
+}
+
+
+def jit(function):
+    """     Compiles function when Numba is installed, otherwise it runs as is (slowly, NumPy scalar by scalar)     """
+    return numba.njit(cache=True)(function) if IS_COMPILED else function
+
+
+# ------------- #
+# -- KERNELS -- #
+# ------------- #
+
+@jit
+def route_distance(order, distance_matrix):
+    """     Total distance of an open route     """
+    total = 0.0
+    for index in range(order.shape[0] - 1):
+        total += distance_matrix[order[index], order[index + 1]]
+    return total
+
+
+@jit
+def crossover_half(order_a, order_b, child):
+    """     First half of order_a, then the other cities in the order of order_b, written to child     """
+    size = order_a.shape[0]
+    mid_point = size // 2
+    used = np.zeros(size, dtype=np.bool_)
+    for index in range(mid_point):
+        child[index] = order_a[index]
+        used[order_a[index]] = True
+    position = mid_point
+    for index in range(size):
+        city = order_b[index]
+        if not used[city]:
+            child[position] = city
+            position += 1
+
+
+@jit
+def get_connection_distance(order, position, distance_matrix):
+    """     Distance of the connection starting at position, 0 past either end     """
+    if position < 0 or position >= order.shape[0] - 1:
+        return 0.0
+    return distance_matrix[order[position], order[position + 1]]
+
+
+@jit
+def get_edge_distance(a, b, distance_matrix):
+    """     Distance between two cities, 0 if either is -1 (an end of the order was passed)     """
+    if a < 0 or b < 0:
+        return 0.0
+    return distance_matrix[a, b]
+
+
+@jit
+def mutate(order, indexes, mutation, distance_matrix):
+    """
+        Same process as RouteOptimizationGeneticAlgorithm.mutation_v3,
+        indexes holding the (index1, index2) pair of every mutation
+        one after the other. Mutates order in place and returns the
+        change in total distance.
+    """
+    size = order.shape[0]
+    delta = 0.0
+    for pair in range(indexes.shape[0] // 2):
+        index1 = indexes[2 * pair]
+        index2 = indexes[2 * pair + 1]
+        if mutation == 2:
+            # -- Insert: move the city at index1 so that it ends up at index2 -- #
+            if index1 == index2:
+                continue
+            city = int(order[index1])
+            previous = int(order[index1 - 1]) if index1 > 0 else -1
+            following = int(order[index1 + 1]) if index1 < size - 1 else -1
+            delta += (
+                get_edge_distance(previous, following, distance_matrix)
+                - get_edge_distance(previous, city, distance_matrix)
+                - get_edge_distance(city, following, distance_matrix)
+            )
+            for position in range(index1, size - 1):
+                order[position] = order[position + 1]
+            previous = int(order[index2 - 1]) if index2 > 0 else -1
+            following = int(order[index2]) if index2 < size - 1 else -1
+            delta += (
+                get_edge_distance(previous, city, distance_matrix)
+                + get_edge_distance(city, following, distance_matrix)
+                - get_edge_distance(previous, following, distance_matrix)
+            )
+            for position in range(size - 1, index2, -1):
+                order[position] = order[position - 1]
+            order[index2] = city
+            continue
+        index1, index2 = min(index1, index2), max(index1, index2)
+        if mutation == 1:
+            # -- Reverse: only the two outer connections change -- #
+            before = get_connection_distance(order, index1 - 1, distance_matrix) + get_connection_distance(order, index2, distance_matrix)
+            order[index1:index2 + 1] = order[index1:index2 + 1][::-1].copy()
+            delta += get_connection_distance(order, index1 - 1, distance_matrix) + get_connection_distance(order, index2, distance_matrix) - before
+            continue
+        # -- Swap: the connections touching either position change -- #
+        if index1 == index2:
+            continue
+        before = (
+            get_connection_distance(order, index1 - 1, distance_matrix)
+            + get_connection_distance(order, index1, distance_matrix)
+            + get_connection_distance(order, index2, distance_matrix)
+        )
+        if index2 - 1 != index1:
+            before += get_connection_distance(order, index2 - 1, distance_matrix)
+        order[index1], order[index2] = order[index2], order[index1]
+        after = (
+            get_connection_distance(order, index1 - 1, distance_matrix)
+            + get_connection_distance(order, index1, distance_matrix)
+            + get_connection_distance(order, index2, distance_matrix)
+        )
+        if index2 - 1 != index1:
+            after += get_connection_distance(order, index2 - 1, distance_matrix)
+        delta += after - before
+    return delta
+
+
+class Kernels:
+
+    """
+        Runs the kernels on PopulationOrder data (a packed array of
+        city indexes), viewed as a NumPy array without copying.
+    """
+
+    def __init__(self, distance_matrix: list):
+        self.distance_matrix = np.asarray(distance_matrix, dtype=np.float64)
+
+    def route_distance(self, data: array) -> float:
+        return float(route_distance(np.frombuffer(data, dtype=data.typecode), self.distance_matrix))
+
+    def crossover_v2(self, po_a, po_b):
+        """     Kernel version of RouteOptimizationGeneticAlgorithm.crossover_v2     """
+        child = array(po_a.data.typecode, bytes(len(po_a.data) * po_a.data.itemsize))
+        crossover_half(
+            np.frombuffer(po_a.data, dtype=po_a.data.typecode),
+            np.frombuffer(po_b.data, dtype=po_b.data.typecode),
+            np.frombuffer(child, dtype=child.typecode),
+        )
+        po_a.data = child
+        return po_a
+
+    def mutation_v3(self, po, indexes: list, mutation: str):
+        """     Kernel version of RouteOptimizationGeneticAlgorithm.mutation_v3, indexes drawn by the caller     """
+        delta = mutate(
+            np.frombuffer(po.data, dtype=po.data.typecode),
+            np.array(indexes, dtype=np.int64),
+            MUTATION_CODES[mutation],
+            self.distance_matrix,
+        )
+        po.add_distance_delta(delta)
+        return po
@@ -0,0 +1,178 @@
+"""
+    Coordinate Loaders
+
+    Read the (x,y) coordinates of the routes from files, so that
+    the solver can run without the routes being clicked on the
+    GUI canvas.
+
+    Files are streamed (text) or memory mapped (binary) into a
+    CoordinateArray, a flat buffer of x,y values, rather than a list
+    of tuples, so that instances of a million cities stay compact:
+        - text / CSV: one "x,y" coordinate per line
+        - TSPLIB .tsp: NODE_COORD_SECTION
+        - binary (.bin / .f32): raw little endian float32 x,y pairs
+"""
+import mmap
+import os
+import sys
+from array import array
+from itertools import chain
+
+# -- File extension => loader, anything else is read as text -- #
+BINARY_EXTENSIONS = ('.bin', '.f32')
+TSPLIB_EXTENSIONS = ('.tsp',)
+
+
+class CoordinateArray:
+
+    """
+        Sequence of (x,y) tuples backed by one flat buffer of
+        interleaved x,y values: an array('d') or a memory mapped
+        float32 view. Indexing builds the tuple on access, so it can
+        be used wherever a list of coordinates is expected.
+    """
+
+    __slots__ = ('values',)
+
+    def __init__(self, values=None):
+        self.values = array('d') if values is None else values
+
+    @classmethod
+    def from_coordinates(cls, coordinates):
+        """     Packs any iterable of (x,y) pairs     """
+        return cls(array('d', chain.from_iterable(coordinates)))
+
+    def __len__(self):
+        return len(self.values) // 2
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('coordinate index out of range')
+        return self.values[2 * index], self.values[2 * index + 1]
+
+    def __iter__(self):
+        return zip(self.values[0::2], self.values[1::2])
+
+    def __reduce__(self):
+        """     A memory map does not pickle, the values are copied instead (e.g. to island processes)     """
+        if isinstance(self.values, array):
+            return CoordinateArray, (self.values,)
+        return CoordinateArray, (array(self.values.format, self.values),)
+
+    def append(self, x: float, y: float) -> None:
+        self.values.append(x)
+        self.values.append(y)
+
+
+def load_file(path: str, columns: tuple = None) -> CoordinateArray:
+    """     Picks the loader from the file extension, columns only applying to text files (see load_coordinates)     """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in BINARY_EXTENSIONS:
+        return load_binary(path)
+    if extension in TSPLIB_EXTENSIONS:
+        return load_tsplib(path)[1]
+    return load_coordinates(path, columns)
+
+
+def load_coordinates(path: str, columns: tuple = None) -> CoordinateArray:
+    """
+        Text file with one coordinate per line, x and y separated
+        by a comma and/or whitespace. Blank lines and lines starting
+        with # are ignored. CSV files with more fields per line are
+        read with columns, the (x, y) field indexes. A first line
+        that is not numeric is skipped as the CSV header.
+    """
+    coordinates = CoordinateArray()
+    fields = (0, 1) if columns is None else columns
+    is_first = True
+    with open(path) as file:
+        for line_number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            values = line.replace(',', ' ').split()
+            try:
+                if columns is None and len(values) != 2:
+                    raise IndexError
+                x, y = float(values[fields[0]]), float(values[fields[1]])
+            except (ValueError, IndexError):
+                # -- A first line that is not numeric is the CSV header -- #
+                if is_first and not all(is_number(value) for value in values):
+                    is_first = False
+                    continue
+                expected = '"x,y"' if columns is None else f'numbers in fields {columns}'
+                raise ValueError(f'{path}:{line_number}: expected {expected}, got {line!r}') from None
+            is_first = False
+            coordinates.append(x, y)
+    return coordinates
+
+
+def is_number(value: str) -> bool:
+    """     Whether a field of a text file parses as a float     """
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def load_tsplib(path: str) -> tuple:
+    """
+        TSPLIB .tsp file with a NODE_COORD_SECTION (EUC_2D, CEIL_2D,
+        ATT or GEO). Returns the instance NAME and its coordinates in
+        node order. Distances are always computed as plain euclidean
+        distances by the genetic algorithm.
+    """
+    name = None
+    coordinates = CoordinateArray()
+    in_coordinates = False
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            if in_coordinates:
+                if line == 'EOF' or not line[0].isdigit():
+                    break
+                _, x, y = line.split()[:3]
+                coordinates.append(float(x), float(y))
+            elif line.startswith('NAME'):
+                name = line.split(':', 1)[1].strip()
+            elif line.startswith('NODE_COORD_SECTION'):
+                in_coordinates = True
+            elif line.startswith('EDGE_WEIGHT_TYPE') and line.split(':', 1)[1].strip() == 'EXPLICIT':
+                raise ValueError(f'{path}: EXPLICIT edge weights are not supported, coordinates are required')
+    return name, coordinates
+
+
+def load_binary(path: str) -> CoordinateArray:
+    """
+        Raw little endian float32 x,y pairs, memory mapped: nothing
+        is read until a coordinate is used, and pages are shared
+        with the OS file cache.
+    """
+    size = os.path.getsize(path)
+    if size % 8:
+        raise ValueError(f'{path}: size {size} is not a multiple of 8 bytes (float32 x,y pairs)')
+    if size == 0:
+        return CoordinateArray(array('f'))
+    with open(path, 'rb') as file:
+        # -- The view keeps the map open once the file is closed -- #
+        values = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)).cast('f')
+    if sys.byteorder != 'little':
+        values = array('f', values)
+        values.byteswap()
+    return CoordinateArray(values)
+
+
+def save_binary(coordinates, path: str) -> None:
+    """     Writes coordinates in the layout read by load_binary      """
+    values = array('f', chain.from_iterable(coordinates))
+    if sys.byteorder != 'little':
+        values.byteswap()
+    with open(path, 'wb') as file:
+        values.tofile(file)
@@ -0,0 +1,191 @@
+"""
+    Local Search (memetic refinement)
+
+    2-opt and Or-opt improvement of a single order of city indexes.
+    Candidate moves are restricted to the k nearest neighbours of
+    each city, and don't-look bits keep cities whose surroundings
+    did not change out of the queue, so that a pass stays close to
+    linear in the number of cities.
+
+    Orders are open routes: position -1 and position N are the
+    (free) ends of the route, so connections to them cost nothing.
+"""
+import time
+from array import array
+from collections import deque
+from app.spatial import KDTree
+
+# -- Smallest gain considered an improvement (float noise) -- #
+EPSILON = 1e-9
+
+
+def get_neighbour_lists(coordinates: list, spatial_index: KDTree, k: int) -> list:
+    """     The k nearest cities of every city, nearest first      """
+    return [
+        spatial_index.k_nearest(*coordinates[a], k, exclude=a)
+        for a in range(len(coordinates))
+    ]
+
+
+def get_distance(tour: list, distance_matrix: list, i: int, j: int) -> float:
+    """     Distance between the cities at positions i and j, 0 if either is an end of the route     """
+    if i < 0 or j < 0 or i >= len(tour) or j >= len(tour):
+        return 0
+    return distance_matrix[tour[i]][tour[j]]
+
+
+def two_opt(tour: list, distance_matrix: list, neighbours: list, deadline: float or None) -> float:
+    """
+        Replaces connections (p, p+1) and (q, q+1) with (p, q) and
+        (p+1, q+1) by reversing positions p+1..q, whenever it
+        shortens the route. Modifies tour in place and returns the
+        change in total distance.
+    """
+    size = len(tour)
+    position = [0] * size
+    for index, city in enumerate(tour):
+        position[city] = index
+    queue = deque(tour)
+    queued = bytearray(b'\x01') * size
+    delta = 0
+    while queue:
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+        a = queue.popleft()
+        queued[a] = 0
+        i = position[a]
+        longest = max(get_distance(tour, distance_matrix, i, i + 1), get_distance(tour, distance_matrix, i - 1, i))
+        for c in neighbours[a]:
+            if distance_matrix[a][c] >= longest:
+                break
+            j = position[c]
+            low, high = min(i, j), max(i, j)
+            # -- New connection (a, c) either as (p, q) or as (p+1, q+1) -- #
+            for p, q in ((low, high), (low - 1, high - 1)):
+                if q - p < 2:
+                    continue
+                gain = (
+                    get_distance(tour, distance_matrix, p, p + 1) + get_distance(tour, distance_matrix, q, q + 1)
+                    - get_distance(tour, distance_matrix, p, q) - get_distance(tour, distance_matrix, p + 1, q + 1)
+                )
+                if gain > EPSILON:
+                    break
+            else:
+                continue
+            # -- Apply move -- #
+            tour[p + 1:q + 1] = tour[p + 1:q + 1][::-1]
+            for index in range(p + 1, q + 1):
+                position[tour[index]] = index
+            delta -= gain
+            # -- Wake up the cities whose connections changed -- #
+            for index in (p, p + 1, q, q + 1):
+                if 0 <= index < size and not queued[tour[index]]:
+                    queued[tour[index]] = 1
+                    queue.append(tour[index])
+            break
+    return delta
+
+
+def or_opt(tour: list, distance_matrix: list, neighbours: list, deadline: float or None, max_segment: int = 3) -> float:
+    """
+        Moves a segment of 1 to max_segment cities next to one of
+        the nearest neighbours of its first city, possibly reversed,
+        whenever it shortens the route. Modifies tour in place and
+        returns the change in total distance.
+    """
+    size = len(tour)
+    position = [0] * size
+    for index, city in enumerate(tour):
+        position[city] = index
+    queue = deque(tour)
+    queued = bytearray(b'\x01') * size
+    delta = 0
+    while queue:
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+        a = queue.popleft()
+        queued[a] = 0
+        i = position[a]
+        move = None
+        for length in range(1, max_segment + 1):
+            end = i + length - 1
+            if end >= size:
+                break
+            # -- Gain of closing the gap left by segment i..end -- #
+            removal = (
+                get_distance(tour, distance_matrix, i - 1, i) + get_distance(tour, distance_matrix, end, end + 1)
+                - get_distance(tour, distance_matrix, i - 1, end + 1)
+            )
+            if removal <= EPSILON:
+                continue
+            for c in neighbours[a]:
+                if distance_matrix[a][c] >= removal:
+                    break
+                j = position[c]
+                if i <= j <= end:
+                    continue
+                # -- After c: c, a..end, c+1 -- #
+                if not i <= j + 1 <= end:
+                    cost = distance_matrix[a][c] + get_distance(tour, distance_matrix, end, j + 1) - get_distance(tour, distance_matrix, j, j + 1)
+                    if removal - cost > EPSILON:
+                        move = (length, j, False, removal - cost)
+                        break
+                # -- Before c: c-1, end..a, c -- #
+                if not i <= j - 1 <= end:
+                    cost = distance_matrix[a][c] + get_distance(tour, distance_matrix, j - 1, end) - get_distance(tour, distance_matrix, j - 1, j)
+                    if removal - cost > EPSILON:
+                        move = (length, j, True, removal - cost)
+                        break
+            if move is not None:
+                break
+        if move is None:
+            continue
+        # -- Apply move -- #
+        length, j, is_reversed, gain = move
+        segment = tour[i:i + length]
+        touched = [tour[index] for index in (i - 1, i + length, j - 1, j, j + 1) if 0 <= index < size]
+        # -- Only the cities between the segment and its destination shift -- #
+        shifted = range(min(i, j), min(max(i + length, j + 2), size))
+        del tour[i:i + length]
+        if j > i:
+            j -= length
+        if is_reversed:
+            tour[j:j] = segment[::-1]
+        else:
+            tour[j + 1:j + 1] = segment
+        for index in shifted:
+            position[tour[index]] = index
+        delta -= gain
+        # -- Wake up the cities whose connections changed -- #
+        for city in touched + segment:
+            if not queued[city]:
+                queued[city] = 1
+                queue.append(city)
+    return delta
+
+
+# -- Local search name => functions applied in turn -- #
+LOCAL_SEARCH_METHODS = {
+    '2-opt': (two_opt,),
+    'or-opt': (or_opt,),
+    '2-opt+or-opt': (two_opt, or_opt),
+}
+
+
+def improve(data: array, distance_matrix: list, neighbours: list, method: str, deadline: float or None) -> tuple:
+    """
+        Runs the moves of method until none of them improves the
+        route any more (or the deadline passes). Returns the new
+        order as an array of the same typecode, and the change in
+        total distance.
+    """
+    tour = data.tolist()
+    delta = 0
+    while True:
+        improvement = 0
+        for function in LOCAL_SEARCH_METHODS[method]:
+            improvement += function(tour, distance_matrix, neighbours, deadline)
+        delta += improvement
+        if improvement > -EPSILON or (deadline is not None and time.perf_counter() > deadline):
+            break
+    return array(data.typecode, tour), delta
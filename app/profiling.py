@@ -0,0 +1,111 @@
+"""
+    Profiling
+
+    Opt-in instrumentation of a genetic algorithm engine. Attaching a
+    Profiler replaces the phase methods of that one instance with
+    timed wrappers, so an engine that is not profiled runs exactly
+    the same code as before, without any check or timer.
+"""
+import time
+
+
+class Profiler:
+
+    """
+        Cumulative seconds per phase, counters and the duration of
+        the last generation. Phases are read from the engine's
+        PROFILED_PHASES (phase name => method name).
+    """
+
+    def __init__(self):
+        self.phase_seconds = dict()
+        # -- walks: orders actually walked, walks_skipped: distance carried over, -- #
+        # -- cache_hits: distance found in the fitness cache instead of walking  -- #
+        self.counters = {
+            'generations': 0,
+            'evaluations': 0,
+            'walks': 0,
+            'walks_skipped': 0,
+            'cache_hits': 0,
+            'duplicate_children': 0,
+        }
+        self.generation_seconds = 0.0
+        self.last_generation_seconds = 0.0
+
+    def attach(self, genetic_algorithm) -> None:
+        """     Wraps the phase methods of this engine instance (its class is left untouched)     """
+        for phase, method_name in genetic_algorithm.PROFILED_PHASES.items():
+            self.phase_seconds[phase] = 0.0
+            setattr(genetic_algorithm, method_name, self.get_timed(getattr(genetic_algorithm, method_name), phase))
+        # -- Whole generations, callbacks excluded -- #
+        genetic_algorithm.set_next_population = self.get_timed_generation(genetic_algorithm.set_next_population)
+        # -- Evaluation counters (object engine) -- #
+        if hasattr(genetic_algorithm, 'evaluate'):
+            genetic_algorithm.evaluate = self.get_counted_evaluate(genetic_algorithm.evaluate, genetic_algorithm)
+
+    @staticmethod
+    def detach(genetic_algorithm) -> None:
+        """     Removes the wrappers, back to the class methods     """
+        for method_name in (*genetic_algorithm.PROFILED_PHASES.values(), 'set_next_population', 'evaluate'):
+            genetic_algorithm.__dict__.pop(method_name, None)
+
+    def get_timed(self, method, phase: str):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.phase_seconds[phase] += time.perf_counter() - started
+        return timed
+
+    def get_timed_generation(self, method):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.last_generation_seconds = time.perf_counter() - started
+                self.generation_seconds += self.last_generation_seconds
+                self.counters['generations'] += 1
+        return timed
+
+    def get_counted_evaluate(self, method, genetic_algorithm):
+        def counted(po):
+            self.counters['evaluations'] += 1
+            # -- Looked up per call: the cache is only created further into init -- #
+            fitness_cache = getattr(genetic_algorithm, 'fitness_cache', None)
+            hits = fitness_cache.hits if fitness_cache is not None else 0
+            is_known = po.total_distance is not None
+            is_new = method(po)
+            if is_known:
+                self.counters['walks_skipped'] += 1
+            elif fitness_cache is not None and fitness_cache.hits > hits:
+                self.counters['cache_hits'] += 1
+            else:
+                self.counters['walks'] += 1
+            if not is_new:
+                self.counters['duplicate_children'] += 1
+            return is_new
+        return counted
+
+    def reset(self) -> None:
+        """     Zeroes every timer and counter, the wrappers stay in place     """
+        for phase in self.phase_seconds:
+            self.phase_seconds[phase] = 0.0
+        for counter in self.counters:
+            self.counters[counter] = 0
+        self.generation_seconds = 0.0
+        self.last_generation_seconds = 0.0
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def get_snapshot(self) -> dict:
+        generations = self.counters['generations']
+        return {
+            'phase_seconds': dict(self.phase_seconds),
+            'counters': dict(self.counters),
+            'generation_seconds': self.generation_seconds,
+            'last_generation_seconds': self.last_generation_seconds,
+            'average_generation_seconds': self.generation_seconds / generations if generations else None,
+        }
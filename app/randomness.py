@@ -0,0 +1,78 @@
+"""
+    Randomness
+
+    Every genetic algorithm draws from its own seeded stream instead
+    of the global random module, so that a run is reproducible from
+    its seed alone and runs sharing a process (or workers started
+    from one seed) do not interfere:
+
+        genetic_algorithm.init(..., seed=42)
+        streams = RandomStream(42).spawn(4)     # one per worker / island
+
+    Random numbers are drawn in blocks (one call per generation step
+    rather than one per gene), and the per gene mutation decisions
+    are skipped ahead geometrically, one draw per mutation.
+"""
+import math
+import random
+
+
+def get_new_seed() -> int:
+    """     64 bit seed from the operating system, for runs started without one     """
+    return random.SystemRandom().getrandbits(64)
+
+
+def get_child_seeds(seed: int, count: int) -> list:
+    """
+        count seeds of independent streams derived from seed. A
+        string seed is hashed (SHA-512) by random.Random, so child
+        streams do not overlap with the parent or with each other.
+    """
+    return [random.Random(f'{seed}:{index}').getrandbits(64) for index in range(count)]
+
+
+class RandomStream(random.Random):
+
+    """
+        random.Random remembering the seed it started from (a new
+        one when not given) so that it can be reported, saved and
+        split into child streams.
+    """
+
+    def __init__(self, seed: int = None):
+        self.initial_seed = get_new_seed() if seed is None else seed
+        super().__init__(self.initial_seed)
+
+    def spawn(self, count: int) -> list:
+        """     count independent child streams, the same ones for the same seed     """
+        return [RandomStream(seed) for seed in get_child_seeds(self.initial_seed, count)]
+
+    def get_uniforms(self, count: int) -> list:
+        """     Block of count random floats 0-1     """
+        draw = self.random
+        return [draw() for _ in range(count)]
+
+    def get_indexes(self, count: int, size: int) -> list:
+        """     Block of count random indexes 0 to size - 1     """
+        draw = self.random
+        return [int(draw() * size) for _ in range(count)]
+
+    def get_success_count(self, trials: int, probability: float) -> int:
+        """
+            Number of successes among trials independent draws each
+            succeeding with probability. The gap to the next success
+            is drawn directly (geometric distribution), so the cost is
+            one draw per success rather than one per trial.
+        """
+        if probability <= 0 or trials <= 0:
+            return 0
+        if probability >= 1:
+            return trials
+        log_failure = math.log1p(-probability)
+        draw = self.random
+        count = 0
+        position = int(math.log(1.0 - draw()) / log_failure)
+        while position < trials:
+            count += 1
+            position += 1 + int(math.log(1.0 - draw()) / log_failure)
+        return count
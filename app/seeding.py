@@ -0,0 +1,136 @@
+"""
+    Seeding
+
+    Construction heuristics used to seed part of the initial
+    population with reasonable routes instead of random ones.
+    Every heuristic relies on the KD-tree spatial index, so that
+    building a route is O(N log N) rather than O(N^2).
+"""
+import random
+from app.spatial import KDTree
+
+
+def nearest_neighbour_order(coordinates: list, spatial_index: KDTree, start: int = None) -> list:
+    """
+        Starting from a (random) city, always move to the nearest
+        city that has not been visited yet.
+    """
+    start = random.randrange(len(coordinates)) if start is None else start
+    order = [start]
+    spatial_index.remove(start)
+    while len(spatial_index):
+        city = spatial_index.nearest(*coordinates[order[-1]])
+        spatial_index.remove(city)
+        order.append(city)
+    spatial_index.restore()
+    return order
+
+
+def greedy_edge_order(coordinates: list, spatial_index: KDTree, k: int = 10) -> list:
+    """
+        Greedy matching: candidate connections between each city and
+        its k nearest cities are added shortest first, skipping any
+        that would give a city a third connection or close a loop.
+        The resulting fragments are then chained together, each time
+        moving to the nearest free end of another fragment.
+    """
+    size = len(coordinates)
+    # -- Candidate connections, shortest first -- #
+    candidates = set()
+    for a in range(size):
+        for b in spatial_index.k_nearest(*coordinates[a], k, exclude=a):
+            candidates.add((min(a, b), max(a, b)))
+    candidates = sorted(candidates, key=lambda edge: (
+        (coordinates[edge[0]][0] - coordinates[edge[1]][0]) ** 2 + (coordinates[edge[0]][1] - coordinates[edge[1]][1]) ** 2
+    ))
+    # -- Union-find of fragments, at most 2 connections per city -- #
+    group = list(range(size))
+
+    def find(city):
+        while group[city] != city:
+            group[city] = group[group[city]]
+            city = group[city]
+        return city
+
+    connections = [list() for _ in range(size)]
+    for a, b in candidates:
+        if len(connections[a]) < 2 and len(connections[b]) < 2 and find(a) != find(b):
+            group[find(a)] = find(b)
+            connections[a].append(b)
+            connections[b].append(a)
+    # -- Walk every fragment from one of its ends -- #
+    fragments = list()
+    fragment_of = dict()
+    visited = bytearray(size)
+    for city in range(size):
+        if visited[city] or len(connections[city]) > 1:
+            continue
+        fragment = [city]
+        visited[city] = 1
+        while True:
+            following = [i for i in connections[fragment[-1]] if not visited[i]]
+            if not following:
+                break
+            visited[following[0]] = 1
+            fragment.append(following[0])
+        fragment_of[fragment[0]] = fragment_of[fragment[-1]] = len(fragments)
+        fragments.append(fragment)
+    # -- Chain the fragments, nearest free end first -- #
+    ends = KDTree(coordinates, fragment_of.keys())
+    order = list()
+    fragment = fragments[0]
+    while True:
+        ends.remove(fragment[0])
+        ends.remove(fragment[-1])
+        order.extend(fragment)
+        city = ends.nearest(*coordinates[order[-1]])
+        if city is None:
+            break
+        fragment = fragments[fragment_of[city]]
+        if fragment[0] != city:
+            fragment = fragment[::-1]
+    return order
+
+
+def space_filling_curve_order(coordinates: list, spatial_index: KDTree = None, bits: int = 16) -> list:
+    """
+        Visits the cities in the order of their position along a
+        Hilbert curve covering the bounding box of the coordinates,
+        which keeps cities that are close in space close in the order.
+    """
+    xs = [x for x, _ in coordinates]
+    ys = [y for _, y in coordinates]
+    min_x, min_y = min(xs), min(ys)
+    scale = ((1 << bits) - 1) / max(max(xs) - min_x, max(ys) - min_y, 1e-12)
+    keys = [
+        hilbert_index(int((x - min_x) * scale), int((y - min_y) * scale), bits)
+        for x, y in coordinates
+    ]
+    return sorted(range(len(coordinates)), key=keys.__getitem__)
+
+
+def hilbert_index(x: int, y: int, bits: int) -> int:
+    """     Distance along the Hilbert curve of order bits of the grid cell (x,y)     """
+    index = 0
+    n = 1 << bits
+    s = n >> 1
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        index += s * s * ((3 * rx) ^ ry)
+        # -- Rotate the quadrant -- #
+        if ry == 0:
+            if rx == 1:
+                x = n - 1 - x
+                y = n - 1 - y
+            x, y = y, x
+        s >>= 1
+    return index
+
+
+# -- Seed strategy name => function(coordinates, spatial_index) -- #
+SEED_STRATEGIES = {
+    'nearest_neighbour': nearest_neighbour_order,
+    'greedy': greedy_edge_order,
+    'space_filling_curve': space_filling_curve_order,
+}
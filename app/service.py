@@ -0,0 +1,179 @@
+"""
+    Batch Service
+
+        python -m app batch jobs.jsonl --workers 4 --output results.jsonl
+        python -m app serve --port 8080 --workers 4
+
+    Solves many small route problems on a pool of worker processes.
+    Workers are started once and reused for every job, and results
+    are streamed back as each job finishes (not in submission order).
+
+    A job is one JSON object:
+        {
+            "id": "job-1",
+            "coordinates": [[x, y], ...],
+            "options": {"population_size": 50, "crossover": "ox", ...},
+            "stopping": {"time_budget": 0.5, "target_distance": 1200, ...},
+            "seed": 0
+        }
+    Only coordinates is required. options are init options of
+    RouteOptimizationGeneticAlgorithm (JOB_OPTIONS for the defaults),
+    seed that of the job's random stream (returned in the result, so
+    a job can be replayed) and stopping the rules of
+    app.stopping.StoppingCriteria, the job stopping at the first one
+    met (JOB_STOPPING for the defaults). A job that cannot be solved
+    (not an object, fewer than two distinct coordinates, invalid
+    options...) gets a result with an error, the other jobs carrying on.
+
+    The HTTP endpoint accepts:
+        POST /solve     one job                 => its result
+        POST /batch     one job per line        => one result per line, as each finishes
+"""
+import json
+import multiprocessing
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.genetic_algorithm import RouteOptimizationGeneticAlgorithm
+from app.stopping import StoppingCriteria
+
+# -- Default init options of a job -- #
+JOB_OPTIONS = {
+    'population_size': 50,
+    'mutation_rate': 0.01,
+    'minimizing_factor': 1,
+}
+
+# -- Default stopping rules of a job -- #
+JOB_STOPPING = {
+    'threshold': 100,
+    'time_budget': 1.0,
+}
+
+
+def get_job_coordinates(job: dict) -> list:
+    """     (x, y) coordinates of a job, at least two of them distinct so that every route has a length      """
+    coordinates = [(float(x), float(y)) for x, y in job['coordinates']]
+    if len(set(coordinates)) < 2:
+        raise ValueError(f'at least 2 distinct coordinates are required, got {len(set(coordinates))}')
+    return coordinates
+
+
+def solve_job(job: dict) -> dict:
+    """     Runs in a worker process. Errors of a job are returned in its result, the worker carries on     """
+    started = time.perf_counter()
+    if not isinstance(job, dict):
+        return {'id': None, 'error': f'ValueError: a job is a JSON object, got {type(job).__name__}'}
+    if 'error' in job:
+        # -- Line that read_jobs could not turn into a job -- #
+        return job
+    try:
+        until = StoppingCriteria(**{**JOB_STOPPING, **job.get('stopping', dict())})
+        genetic_algorithm = RouteOptimizationGeneticAlgorithm()
+        genetic_algorithm.init(
+            available_coordinates=get_job_coordinates(job),
+            **{**JOB_OPTIONS, **job.get('options', dict()), 'seed': job.get('seed')},
+        )
+        for _ in genetic_algorithm.run(until=until):
+            pass
+    except Exception as error:
+        # -- Any failure is the job's result: raised, it would abort every other job of the batch -- #
+        return {'id': job.get('id'), 'error': f'{type(error).__name__}: {error}'}
+    best = genetic_algorithm.best_population_order
+    return {
+        'id': job.get('id'),
+        'order': list(best.data),
+        'total_distance': best.total_distance,
+        'generations': genetic_algorithm.generation,
+        'best_generation': genetic_algorithm.best_generation,
+        'stop_reason': until.reason,
+        'seed': genetic_algorithm.rng.initial_seed,
+        'elapsed_seconds': time.perf_counter() - started,
+    }
+
+
+class BatchSolver:
+
+    """
+        Pool of worker processes solving jobs. The pool lives as long
+        as the solver, so there is no interpreter startup per job.
+    """
+
+    def __init__(self, workers: int = None):
+        self.pool = multiprocessing.Pool(workers)
+
+    def solve(self, jobs):
+        """     Yields the result of every job as soon as it finishes      """
+        return self.pool.imap_unordered(solve_job, jobs)
+
+    def close(self) -> None:
+        self.pool.close()
+        self.pool.join()
+
+
+def read_jobs(lines):
+    """
+        Jobs from JSON lines, numbering the ones without an id. A
+        line that is not a JSON object is yielded as its error result
+        (returned as is by solve_job), so one bad line does not stop
+        the batch.
+    """
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError as error:
+            yield {'id': number, 'error': f'Invalid JSON: {error}'}
+            continue
+        if not isinstance(job, dict):
+            yield {'id': number, 'error': f'ValueError: a job is a JSON object, got {type(job).__name__}'}
+            continue
+        job.setdefault('id', number)
+        yield job
+
+
+# ---------- #
+# -- HTTP -- #
+# ---------- #
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+
+    """     POST /solve and POST /batch, see the module docstring     """
+
+    solver: BatchSolver
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+        try:
+            if self.path == '/solve':
+                jobs = [json.loads(body)]
+            elif self.path == '/batch':
+                jobs = list(read_jobs(body.splitlines()))
+            else:
+                self.send_error(404)
+                return
+        except ValueError as error:
+            self.send_error(400, f'Invalid JSON: {error}')
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json' if self.path == '/solve' else 'application/x-ndjson')
+        self.end_headers()
+        # -- No Content-Length: results are written as they finish, the connection closes at the end -- #
+        for result in self.solver.solve(jobs):
+            self.wfile.write(json.dumps(result).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+def serve(host: str, port: int, workers: int = None) -> None:
+    """     Serves jobs over HTTP until interrupted      """
+    solver = BatchSolver(workers)
+    handler = type('BoundJobRequestHandler', (JobRequestHandler,), {'solver': solver})
+    server = ThreadingHTTPServer((host, port), handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        solver.close()
@@ -0,0 +1,119 @@
+"""
+    Spatial Index
+
+    2-D KD-tree over (x,y) coordinates, built in O(N log N) and
+    answering nearest / k-nearest queries in O(log N) on average.
+    Cities can be removed from (and later restored to) the tree,
+    which is what building a nearest-neighbour route needs:
+    every step asks for the nearest city that was not visited yet.
+"""
+import heapq
+
+
+class KDTree:
+
+    """
+        Nodes are stored in flat lists indexed by node number. Each
+        node holds one city; alive counts the cities of its subtree
+        that are not removed, so that emptied subtrees are skipped.
+    """
+
+    def __init__(self, coordinates: list, indexes: list = None):
+        self.coordinates = coordinates
+        indexes = list(range(len(coordinates))) if indexes is None else list(indexes)
+        size = len(indexes)
+        # -- Flat node storage -- #
+        self.city = [0] * size
+        self.axis = [0] * size
+        self.left = [-1] * size
+        self.right = [-1] * size
+        self.parent = [-1] * size
+        self.alive = [0] * size
+        self.node_of = dict()
+        self.removed = set()
+        self.root = self.build(indexes, 0, -1) if indexes else -1
+
+    def build(self, indexes: list, depth: int, parent: int) -> int:
+        """     Iterative median split, alternating x / y axis by depth     """
+        next_node = 0
+        root = -1
+        stack = [(indexes, depth, parent, None)]
+        while stack:
+            indexes, depth, parent, side = stack.pop()
+            axis = depth % 2
+            indexes.sort(key=lambda index: self.coordinates[index][axis])
+            middle = len(indexes) // 2
+            node = next_node
+            next_node += 1
+            self.city[node] = indexes[middle]
+            self.axis[node] = axis
+            self.parent[node] = parent
+            self.alive[node] = len(indexes)
+            self.node_of[indexes[middle]] = node
+            if parent == -1:
+                root = node
+            elif side == 'left':
+                self.left[parent] = node
+            else:
+                self.right[parent] = node
+            if middle > 0:
+                stack.append((indexes[:middle], depth + 1, node, 'left'))
+            if middle + 1 < len(indexes):
+                stack.append((indexes[middle + 1:], depth + 1, node, 'right'))
+        return root
+
+    def __len__(self):
+        return self.alive[self.root] if self.root != -1 else 0
+
+    def remove(self, city: int) -> None:
+        """     Hides a city from future queries     """
+        if city in self.removed:
+            return
+        self.removed.add(city)
+        node = self.node_of[city]
+        while node != -1:
+            self.alive[node] -= 1
+            node = self.parent[node]
+
+    def restore(self) -> None:
+        """     Brings every removed city back     """
+        for city in self.removed:
+            node = self.node_of[city]
+            while node != -1:
+                self.alive[node] += 1
+                node = self.parent[node]
+        self.removed = set()
+
+    def nearest(self, x: float, y: float) -> int or None:
+        """     Nearest city to (x,y) that was not removed     """
+        found = self.k_nearest(x, y, 1)
+        return found[0] if found else None
+
+    def k_nearest(self, x: float, y: float, k: int, exclude: int = None) -> list:
+        """     Up to k nearest cities to (x,y) that were not removed, nearest first     """
+        point = (x, y)
+        # -- Max-heap of (-squared distance, city) holding the best k so far -- #
+        best = list()
+        # -- (node, squared distance from the point to the node's region side) -- #
+        stack = [(self.root, 0)] if self.root != -1 else []
+        while stack:
+            node, bound = stack.pop()
+            if node == -1 or self.alive[node] == 0:
+                continue
+            # -- The region can only hold closer cities if its splitting line is closer -- #
+            if len(best) == k and bound >= -best[0][0]:
+                continue
+            city = self.city[node]
+            cx, cy = self.coordinates[city]
+            if city not in self.removed and city != exclude:
+                distance = (cx - x) ** 2 + (cy - y) ** 2
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, city))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, city))
+            axis = self.axis[node]
+            difference = point[axis] - (cx, cy)[axis]
+            near, far = (self.left[node], self.right[node]) if difference < 0 else (self.right[node], self.left[node])
+            stack.append((far, max(bound, difference ** 2)))
+            stack.append((near, bound))
+        return [city for _, city in sorted(best, key=lambda item: -item[0])]
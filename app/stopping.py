@@ -0,0 +1,83 @@
+"""
+    Stopping Criteria
+
+    When a run of the genetic algorithm (either engine) should stop,
+    checked before every generation by run(until=...):
+
+        for best in genetic_algorithm.run(until=StoppingCriteria(time_budget=0.05)):
+            ...  # best population order so far, as soon as it improves
+
+    The best order is always available, so a latency bound run stops
+    on its time budget (at most one generation late) with the best
+    order found so far.
+"""
+import time
+
+
+class StoppingCriteria:
+
+    """
+        Stops at the first rule met, rules left at 0 / None being
+        disabled:
+            time_budget             seconds since the run started
+            max_generations         generations in total
+            max_evaluations         population orders evaluated in total
+            target_distance         best total distance at or below target
+            threshold               generations since the best order improved
+            plateau_generations     generations in which the best distance
+                                    improved by less than plateau_tolerance
+                                    (relative), e.g. 0.001 for 0.1%
+            min_diversity           population diversity (genetic_algorithm.get_diversity)
+                                    fallen below min_diversity
+        reason holds the name of the rule that stopped the run.
+    """
+
+    def __init__(self, time_budget: float = 0, max_generations: int = 0, max_evaluations: int = 0,
+                 target_distance: float = None, threshold: int = 0, plateau_generations: int = 0,
+                 plateau_tolerance: float = 0.0, min_diversity: float = None):
+        self.time_budget = time_budget
+        self.max_generations = max_generations
+        self.max_evaluations = max_evaluations
+        self.target_distance = target_distance
+        self.threshold = threshold
+        self.plateau_generations = plateau_generations
+        self.plateau_tolerance = plateau_tolerance
+        self.min_diversity = min_diversity
+        self.started = None
+        self.plateau_distance = None
+        self.plateau_generation = 0
+        self.reason = None
+
+    def start(self) -> None:
+        """     Starts the time budget, at the start of a run     """
+        self.started = time.perf_counter()
+        self.plateau_distance = None
+        self.reason = None
+
+    def get_reason(self, genetic_algorithm) -> str or None:
+        """     Name of the first rule met, None to carry on     """
+        best = genetic_algorithm.best_population_order
+        if self.time_budget and time.perf_counter() - self.started >= self.time_budget:
+            return 'time_budget'
+        if self.max_generations and genetic_algorithm.generation >= self.max_generations:
+            return 'max_generations'
+        if self.max_evaluations and genetic_algorithm.evaluations >= self.max_evaluations:
+            return 'max_evaluations'
+        if self.target_distance is not None and best is not None and best.total_distance <= self.target_distance:
+            return 'target_distance'
+        if self.threshold and genetic_algorithm.generation - genetic_algorithm.best_generation >= self.threshold:
+            return 'threshold'
+        if self.plateau_generations and best is not None:
+            # -- A new plateau starts whenever the best improved by more than the tolerance -- #
+            if self.plateau_distance is None or best.total_distance < self.plateau_distance * (1 - self.plateau_tolerance):
+                self.plateau_distance = best.total_distance
+                self.plateau_generation = genetic_algorithm.generation
+            elif genetic_algorithm.generation - self.plateau_generation >= self.plateau_generations:
+                return 'plateau'
+        if self.min_diversity is not None and genetic_algorithm.get_diversity() < self.min_diversity:
+            return 'min_diversity'
+        return None
+
+    def is_met(self, genetic_algorithm) -> bool:
+        self.reason = self.get_reason(genetic_algorithm)
+        return self.reason is not None
@@ -0,0 +1,147 @@
+"""
+    Uniqueness
+
+    Bounded structures remembering which orders have already been
+    seen, used by the minimizing_factor penalty, and the distances
+    they were walked to. Orders are reduced to a 64 bit fingerprint
+    instead of being kept whole.
+"""
+import hashlib
+import math
+from array import array
+from collections import OrderedDict
+
+
+def hash_bytes(buffer) -> int:
+    """     64 bit hash of a buffer of city indexes     """
+    return int.from_bytes(hashlib.blake2b(buffer, digest_size=8).digest(), 'little')
+
+
+def fingerprint(data) -> int:
+    """
+        Canonical 64 bit fingerprint of an order of city indexes.
+        An order and its reverse walk the same route, so the
+        direction starting with the lower city index is hashed.
+        Orders are open routes (the last city does not connect
+        back to the first), so rotations are different routes and
+        are not folded together.
+    """
+    indexes = array('I', data)
+    if indexes and indexes[0] > indexes[-1]:
+        indexes.reverse()
+    return hash_bytes(indexes)
+
+
+class LRUFingerprintSet:
+
+    """
+        Set of fingerprints holding at most max_size entries, the
+        least recently seen fingerprint being dropped first.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.fingerprints = OrderedDict()
+
+    def __contains__(self, item: int) -> bool:
+        return item in self.fingerprints
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def add(self, item: int) -> None:
+        if item in self.fingerprints:
+            self.fingerprints.move_to_end(item)
+            return
+        self.fingerprints[item] = None
+        if len(self.fingerprints) > self.max_size:
+            self.fingerprints.popitem(last=False)
+
+
+class BloomFilter:
+
+    """
+        Fixed size Bloom filter of fingerprints. Membership can be a
+        false positive with probability false_positive_rate while it
+        holds up to capacity fingerprints; past that the filter is
+        cleared, so memory stays bounded and the rate holds.
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        # -- Optimal number of bits / hash functions for capacity & rate -- #
+        self.bit_count = max(8, int(math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.bit_count / capacity * math.log(2))))
+        self.bits = bytearray((self.bit_count + 7) // 8)
+        self.count = 0
+
+    def __contains__(self, item: int) -> bool:
+        return all(self.bits[bit >> 3] & (1 << (bit & 7)) for bit in self.get_bits(item))
+
+    def __len__(self):
+        return self.count
+
+    def add(self, item: int) -> None:
+        if self.count >= self.capacity:
+            self.bits = bytearray(len(self.bits))
+            self.count = 0
+        for bit in self.get_bits(item):
+            self.bits[bit >> 3] |= 1 << (bit & 7)
+        self.count += 1
+
+    def get_bits(self, item: int) -> list:
+        """     Double hashing: the two 32 bit halves of the fingerprint derive every bit index     """
+        h1 = item & 0xFFFFFFFF
+        h2 = (item >> 32) | 1
+        return [(h1 + i * h2) % self.bit_count for i in range(self.hash_count)]
+
+
+class FitnessCache:
+
+    """
+        Total distance of the orders walked most recently, keyed by
+        their fingerprint and holding at most max_size entries (least
+        recently used dropped first). The fingerprint is canonical,
+        so an order and its reverse share one entry, their open route
+        being the same length.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.distances = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.distances)
+
+    def get(self, item: int) -> float or None:
+        distance = self.distances.get(item)
+        if distance is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.distances.move_to_end(item)
+        return distance
+
+    def add(self, item: int, distance: float) -> None:
+        self.distances[item] = distance
+        if len(self.distances) > self.max_size:
+            self.distances.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.distances),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else None,
+        }
+
+
+# -- Strategy name => factory(max_size, false_positive_rate) -- #
+UNIQUE_PATHS_STRATEGIES = {
+    'lru': lambda max_size, false_positive_rate: LRUFingerprintSet(max_size),
+    'bloom': lambda max_size, false_positive_rate: BloomFilter(max_size, false_positive_rate),
+}
@@ -0,0 +1,318 @@
+"""
+    NumPy implementation of RouteOptimizationGeneticAlgorithm.
+
+    The population is held as a 2-D integer array of shape
+    (population_size, n_cities), each row being one order of
+    city indexes. Every stage of the evolution cycle (selection,
+    crossover, mutation and fitness) runs as a batched array
+    operation over the whole population rather than one
+    PopulationOrder at a time.
+"""
+import numpy as np
+from app.engine import Engine
+from app.genetic_algorithm import PopulationOrder, SELECTION_METHODS
+from app.loaders import CoordinateArray
+from app.randomness import get_new_seed
+from app.uniqueness import UNIQUE_PATHS_STRATEGIES, hash_bytes
+
+
+# -- The engine holds N x N float64 arrays: more cities are left to the object engine -- #
+MAX_CITIES = 5000
+
+
+class VectorizedRouteOptimizationGeneticAlgorithm(Engine):
+
+    """
+        Drop-in alternative to RouteOptimizationGeneticAlgorithm
+        exposing the same init / set_next_generation interface
+        and the same stats attributes.
+    """
+
+    # -- Profiler phase name => method timed for that phase -- #
+    PROFILED_PHASES = {
+        'selection': 'select_parents',
+        'crossover': 'crossover_v2',
+        'mutation': 'mutation_v3',
+        'fitness': 'set_fitness',
+    }
+
+    # -- Core -- #
+    coordinates: list
+    distance_matrix: np.ndarray
+    population_size: int
+    population: np.ndarray
+    generation: int
+    mutation_rate: float
+
+    # -- Fitness (one entry per row of population) -- #
+    total_distances: np.ndarray
+    fitness_scores: np.ndarray
+    fingerprints: list
+
+    # -- STATS -- #
+    best_population_order: PopulationOrder or None
+    best_generation: int
+    current_best_population_order: PopulationOrder or None
+    average_fitness: float
+    evaluations: int
+
+    # -- Uniqueness (bounded set of fingerprints) -- #
+    unique_paths: object
+    unique_paths_max: int
+    unique_paths_strategy: str
+    unique_paths_false_positive_rate: float
+
+    minimizing_factor: float
+
+    # -- Selection -- #
+    selection: str
+    tournament_size: int
+
+    # -- Seeded stream every random draw of the run comes from -- #
+    seed: int
+    rng: np.random.Generator
+
+    def init(self, available_coordinates: list, population_size: int, mutation_rate: float, minimizing_factor: float,
+             selection: str = 'roulette', tournament_size: int = 3, unique_paths_max: int = 100000,
+             unique_paths_strategy: str = 'lru', unique_paths_false_positive_rate: float = 0.001,
+             seed: int = None, profile: bool = False, population: np.ndarray = None) -> None:
+        """
+            seed starts the run's random stream (a new one is drawn
+            when None, see get_options). population, when given, is a (population_size, n_cities)
+            array of orders (e.g. from a checkpoint) to start from
+            instead of a random one.
+        """
+        self.generation = 0
+        # -- Instrumentation -- #
+        self.init_instrumentation(profile)
+        # -- Coordinates / Distances -- #
+        self.coordinates = available_coordinates if isinstance(available_coordinates, CoordinateArray) else list(available_coordinates)
+        self.distance_matrix = self.get_distance_matrix(self.coordinates)
+        # -- Inputs -- #
+        self.population_size = population_size
+        self.mutation_rate = mutation_rate
+        # -- Stats -- #
+        self.average_fitness = 0
+        self.evaluations = 0
+        self.best_population_order = None
+        self.best_generation = 0
+        self.current_best_population_order = None
+        # -- Uniqueness -- #
+        if unique_paths_strategy not in UNIQUE_PATHS_STRATEGIES:
+            raise ValueError(f'Unknown unique paths strategy {unique_paths_strategy!r}, expected one of {sorted(UNIQUE_PATHS_STRATEGIES)}')
+        self.unique_paths_max = unique_paths_max
+        self.unique_paths_strategy = unique_paths_strategy
+        self.unique_paths_false_positive_rate = unique_paths_false_positive_rate
+        self.unique_paths = UNIQUE_PATHS_STRATEGIES[unique_paths_strategy](unique_paths_max, unique_paths_false_positive_rate)
+
+        self.minimizing_factor = minimizing_factor
+
+        # -- Selection -- #
+        if selection not in SELECTION_METHODS:
+            raise ValueError(f'Unknown selection {selection!r}, expected one of {sorted(SELECTION_METHODS)}')
+        self.selection = selection
+        self.tournament_size = tournament_size
+
+        self.seed = get_new_seed() if seed is None else seed
+        self.rng = np.random.default_rng(self.seed)
+
+        # -- Initial Population -- #
+        self.population = self.init_population() if population is None else population
+        self.set_fitness()
+
+    def get_options(self) -> dict:
+        """     init options of this run, apart from the coordinates (see app.checkpoint)     """
+        return {
+            **super().get_options(),
+            'mutation_rate': self.mutation_rate,
+            'tournament_size': self.tournament_size,
+            'seed': self.seed,
+        }
+
+    # -------------------- #
+    # -- INITIALIZATION -- #
+    # -------------------- #
+
+    @staticmethod
+    def get_distance_matrix(coordinates: list) -> np.ndarray:
+        """     Builds the N x N matrix of distances between every pair of coordinates      """
+        if len(coordinates) > MAX_CITIES:
+            raise ValueError(
+                f'{len(coordinates)} cities need {len(coordinates) ** 2 * 24 / 2 ** 30:.1f} GB of N x N arrays in the vectorized engine, '
+                f'which is limited to {MAX_CITIES} cities: use the object engine (distances computed on demand)'
+            )
+        if isinstance(coordinates, CoordinateArray):
+            coordinates = coordinates.values
+        points = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        deltas = points[:, np.newaxis, :] - points[np.newaxis, :, :]
+        return np.sqrt((deltas ** 2).sum(axis=2))
+
+    def init_population(self) -> np.ndarray:
+        """     Every row is an independent random permutation of city indexes      """
+        size = len(self.coordinates)
+        keys = self.rng.random((self.population_size, size))
+        return np.argsort(keys, axis=1).astype(self.get_index_dtype(size))
+
+    @staticmethod
+    def get_index_dtype(size: int):
+        """     Smallest unsigned integer type able to hold every city index      """
+        return np.uint16 if size <= np.iinfo(np.uint16).max else np.uint32
+
+    # ------------------------ #
+    # -- Next Generation(s) -- #
+    # ------------------------ #
+
+    def set_next_population(self) -> None:
+        self.current_best_population_order = None
+        self.population = self.generate_next()
+        self.set_fitness()
+
+    def generate_next(self) -> np.ndarray:
+        """
+            Same process as RouteOptimizationGeneticAlgorithm.generate_next,
+            each step being applied to every child at once.
+        """
+        # -- Up Generation Count -- #
+        self.generation += 1
+        # -- Natural Selection (2 parents per child) -- #
+        parents = self.select_parents(2 * self.population_size)
+        po_a = self.population[parents[:self.population_size]]
+        po_b = self.population[parents[self.population_size:]]
+        # -- CrossOver -- #
+        population = self.crossover_v2(po_a, po_b)
+        # -- Mutation -- #
+        return self.mutation_v3(population)
+
+    def select_parents(self, count: int) -> np.ndarray:
+        """     Draws count row indexes using the configured selection method     """
+        return getattr(self, SELECTION_METHODS[self.selection])(count)
+
+    def natural_selection(self, count: int) -> np.ndarray:
+        """
+            Draws count row indexes with probability according
+            to relative fitness (roulette wheel) using a binary
+            search over the cumulative fitness percentages.
+        """
+        cumulative = np.cumsum(self.fitness_scores)
+        cumulative /= cumulative[-1]
+        indexes = np.searchsorted(cumulative, self.rng.random(count), side='right')
+        return np.minimum(indexes, self.population_size - 1)
+
+    def tournament_selection(self, count: int) -> np.ndarray:
+        """     Fittest of tournament_size uniformly drawn rows, for count tournaments at once     """
+        contestants = self.rng.integers(0, self.population_size, (count, self.tournament_size))
+        winners = np.argmax(self.fitness_scores[contestants], axis=1)
+        return contestants[np.arange(count), winners]
+
+    def stochastic_universal_selection(self, count: int) -> np.ndarray:
+        """     count evenly spaced pointers from one random offset, shuffled before pairing     """
+        cumulative = np.cumsum(self.fitness_scores)
+        cumulative /= cumulative[-1]
+        pointers = (self.rng.uniform(0, 1 / count) + np.arange(count) / count)
+        indexes = np.minimum(np.searchsorted(cumulative, pointers, side='left'), self.population_size - 1)
+        return self.rng.permutation(indexes)
+
+    @staticmethod
+    def crossover_v2(po_a: np.ndarray, po_b: np.ndarray) -> np.ndarray:
+        """
+            First half of every row of po_a followed by the
+            remaining cities in the order they appear in the
+            matching row of po_b.
+        """
+        rows, size = po_a.shape
+        mid_point = int(size / 2)
+        # -- Mark cities already taken from the first parent -- #
+        used = np.zeros((rows, size), dtype=bool)
+        used[np.arange(rows)[:, np.newaxis], po_a[:, :mid_point]] = True
+        # -- Every row keeps exactly size - mid_point cities of po_b -- #
+        keep = ~used[np.arange(rows)[:, np.newaxis], po_b]
+        remainder = po_b[keep].reshape(rows, size - mid_point)
+        return np.concatenate((po_a[:, :mid_point], remainder), axis=1)
+
+    def mutation_v3(self, population: np.ndarray) -> np.ndarray:
+        """
+            Each gene triggers a swap of two random cities of its
+            row with probability mutation_rate, the number of swaps
+            of every row being drawn at once (binomial) rather than
+            one draw per gene. Swaps are applied
+            in rounds holding at most one swap per row, so that
+            fancy indexing never writes the same row twice at once.
+        """
+        rows, size = population.shape
+        swap_rows = np.repeat(np.arange(rows), self.rng.binomial(size, min(max(self.mutation_rate, 0.0), 1.0), rows))
+        if swap_rows.size == 0:
+            return population
+        index1 = self.rng.integers(0, size, swap_rows.size)
+        index2 = self.rng.integers(0, size, swap_rows.size)
+        # -- Rank of each swap within its row (swap_rows is sorted) -- #
+        row_start = np.searchsorted(swap_rows, swap_rows, side='left')
+        rank = np.arange(swap_rows.size) - row_start
+        for swap_round in range(rank.max() + 1):
+            selected = rank == swap_round
+            r, i1, i2 = swap_rows[selected], index1[selected], index2[selected]
+            tmp = population[r, i1]
+            population[r, i1] = population[r, i2]
+            population[r, i2] = tmp
+        return population
+
+    # ------------ #
+    # -- SHARED -- #
+    # ------------ #
+
+    def set_fitness(self) -> None:
+        """
+            (1) Total distance of every row as one gather over the distance matrix
+            (2) Fitness score, penalising orders never seen before by minimizing_factor
+            (3) Best / current best / average statistics
+        """
+        population = self.population
+        self.total_distances = self.distance_matrix[population[:, :-1], population[:, 1:]].sum(axis=1)
+        # -- Uniqueness -- #
+        fingerprints = self.get_fingerprints(population)
+        is_new = np.fromiter(
+            (fingerprint not in self.unique_paths for fingerprint in fingerprints),
+            dtype=bool,
+            count=len(population),
+        )
+        for fingerprint in fingerprints:
+            self.unique_paths.add(fingerprint)
+        self.fingerprints = fingerprints
+        self.evaluations += len(population)
+        if self.profiler is not None:
+            self.profiler.count('evaluations', len(population))
+            self.profiler.count('walks', len(population))
+            self.profiler.count('duplicate_children', len(population) - int(is_new.sum()))
+        self.fitness_scores = 1 / (self.total_distances * np.where(is_new, self.minimizing_factor, 1))
+        # -- GLOBALS: Best ["current"] Population by Fitness Score -- #
+        current_best = int(np.argmax(self.fitness_scores))
+        self.current_best_population_order = self.create_population_order(current_best)
+        # -- GLOBALS: Best Population by Fitness Score -- #
+        if self.best_population_order is None or self.current_best_population_order.fitness_score > self.best_population_order.fitness_score:
+            self.best_population_order = self.current_best_population_order
+            self.best_generation = self.generation
+        # -- GLOBALS: Average Fitness -- #
+        self.average_fitness = float(self.fitness_scores.mean())
+
+    @staticmethod
+    def get_fingerprints(population: np.ndarray) -> list:
+        """
+            Same canonical fingerprint as app.uniqueness.fingerprint:
+            every row is hashed in the direction starting with its
+            lower city index, as 32 bit indexes.
+        """
+        reverse = population[:, 0] > population[:, -1]
+        canonical = np.where(reverse[:, np.newaxis], population[:, ::-1], population).astype(np.uint32)
+        return [hash_bytes(row) for row in canonical]
+
+    def get_diversity(self) -> float:
+        """     Share of distinct orders in the population (1 when every order differs)     """
+        return len(set(self.fingerprints)) / len(self.fingerprints)
+
+    def create_population_order(self, row: int) -> PopulationOrder:
+        """     Wraps one row of the population as a PopulationOrder for display / stats      """
+        po = PopulationOrder(self.population[row].tolist(), do_shuffle=False)
+        po.total_distance = float(self.total_distances[row])
+        po.fitness_score = float(self.fitness_scores[row])
+        po.fitness_score_percent = po.fitness_score / float(self.fitness_scores.sum())
+        return po
+
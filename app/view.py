@@ -1,5 +1,10 @@
+import queue
+import threading
 import tkinter as tk
+from tkinter import messagebox
 from app.genetic_algorithm import RouteOptimizationGeneticAlgorithm
+from app.history import HistoryBuffer
+from app.stopping import StoppingCriteria
 import matplotlib
 matplotlib.use("TkAgg")
 from matplotlib.figure import Figure
@@ -24,6 +29,7 @@ class AppGUI:
     best_fitness = tk.StringVar()
     best_generation = tk.StringVar()
     best_distance = tk.StringVar()
+    generation_time = tk.StringVar()
     minimizing_factor = tk.StringVar()
 
     # -- Canvas -- #
@@ -37,14 +43,23 @@ class AppGUI:
     # -- Routes -- #
     genetic_algorithm = RouteOptimizationGeneticAlgorithm()
     routes = list()
-    route_connections = list()
+    route_connections = list()  # canvas line ids, one per connection of the rendered order
+    route_segments = list()  # (x1, y1, x2, y2) currently drawn by each line id
+    rendered_population_order = None
 
     # -- Start/Stop Global -- #
     is_genetic_algorithm_running = False
 
+    # -- Worker Thread -- #
+    worker = None
+    stop_event = threading.Event()
+    snapshots = None  # queue of the current run, snapshots of any other run are stale
+    frame_interval = 33  # msec between UI refreshes (~30 fps)
+
     # -- Graphs -- #
     graphs = dict()
     graphs_data = dict()
+    graphs_capacity = 2048  # points kept per graph, older points are downsampled
 
     def __init__(self):
         # -- Add Title -- #
@@ -105,6 +120,9 @@ class AppGUI:
         row_count += 1
         tk.Label(frame, text="Average Fitness Score:").grid(row=row_count, column=0, sticky=tk.W)
         tk.Label(frame, textvariable=self.average_fitness, font="Helvetica 8 bold", justify=tk.RIGHT).grid(row=row_count, column=2, sticky=tk.E)
+        row_count += 1
+        tk.Label(frame, text="Generation Time (ms):").grid(row=row_count, column=0, sticky=tk.W)
+        tk.Label(frame, textvariable=self.generation_time, font="Helvetica 8 bold", justify=tk.RIGHT).grid(row=row_count, column=2, sticky=tk.E)
 
         # -- SPACE -- #
         row_count += 2
@@ -126,6 +144,7 @@ class AppGUI:
         self.best_fitness.set('-')
         self.best_generation.set('-')
         self.best_distance.set('-')
+        self.generation_time.set('-')
         self.minimizing_factor.set('1')
 
     def init_canvas_frame(self):
@@ -138,76 +157,117 @@ class AppGUI:
         self.canvas_id.pack()
 
     def init_graphs(self):
+
+        """
+            Both graphs are built once. Their lines are updated in
+            place and redrawn with blitting while a run is going.
+        """
+
+        self.reset_graphs_data()
+
         frame_label = tk.LabelFrame(self.window, text="Graph 1")
         frame_label.pack(side='left', anchor=tk.N, expand="yes")
         frame = tk.Frame(frame_label, width=400, height=400)
         frame.pack(fill='both', padx=10, pady=5, expand=True)
-        self.graphs['graph1'] = frame
+        self.graphs['graph1'] = self.create_graph(
+            frame,
+            title='Total Distance by Generation',
+            ylabel='Total Distance',
+            colors=(None,),
+        )
 
         frame_label = tk.LabelFrame(self.window, text="Graph 2")
         frame_label.pack(side='left', anchor=tk.N, expand="yes")
         frame = tk.Frame(frame_label, width=400, height=400)
         frame.pack(fill='both', padx=10, pady=5, expand=True)
-        self.graphs['graph2'] = frame
+        self.graphs['graph2'] = self.create_graph(
+            frame,
+            title='OverallBest/CurrentBest Fitness by Generation',
+            ylabel='Fitness',
+            colors=('r', 'g'),
+        )
 
-    def update_graph_1(self):
-        frame = self.graphs['graph1']
-        x, y = list(), list()
-        for i in self.graphs_data['graph1']:
-            _x, _y = i
-            x.append(_x)
-            y.append(_y)
-
-        for widget in frame.winfo_children():
-            widget.destroy()
+    @staticmethod
+    def create_graph(frame, title: str, ylabel: str, colors: tuple) -> dict:
         fig = Figure(figsize=(7, 6), dpi=75)
-        fig.suptitle('Total Distance by Generation', fontsize=20)
+        fig.suptitle(title, fontsize=20)
         plot1 = fig.add_subplot(111)
-        plot1.plot(
-            x,  # X
-            y  # Y
-        )
-        plot1.set_ylabel("Total Distance", fontsize=14)
+        # -- Animated lines are left out of the saved background -- #
+        lines = [plot1.plot([], [], color=color, animated=True)[0] for color in colors]
+        plot1.set_ylabel(ylabel, fontsize=14)
         plot1.set_xlabel("Generation", fontsize=14)
         canvas = FigureCanvasTkAgg(fig, master=frame)
+        # -- is_fitted: limits fitted to the data of the current run -- #
+        graph = {'figure': fig, 'axes': plot1, 'lines': lines, 'canvas': canvas, 'background': None, 'is_fitted': False}
+
+        def on_draw(event):
+            # -- Full redraw (limits changed, window resized, ...) => new background -- #
+            graph['background'] = canvas.copy_from_bbox(plot1.bbox)
+            for line in lines:
+                plot1.draw_artist(line)
+
+        canvas.mpl_connect('draw_event', on_draw)
         canvas.draw()
         canvas.get_tk_widget().pack()
         toolbar = NavigationToolbar2Tk(canvas, frame)
         toolbar.update()
         canvas.get_tk_widget().pack()
+        return graph
+
+    def reset_graphs_data(self):
+        # -- graph1: generation, best distance / graph2: generation, best fitness, current best fitness -- #
+        self.graphs_data = {
+            'graph1': HistoryBuffer(self.graphs_capacity, columns=2),
+            'graph2': HistoryBuffer(self.graphs_capacity, columns=3),
+        }
+        # -- A new run is fitted again, rather than drawn into the limits of the previous one -- #
+        for graph in self.graphs.values():
+            graph['axes'].set_xlim(0, 1)
+            graph['axes'].set_ylim(0, 1)
+            graph['background'] = None
+            graph['is_fitted'] = False
+
+    def update_graph_1(self):
+        history = self.graphs_data['graph1']
+        self.update_graph(self.graphs['graph1'], history.get(0), [history.get(1)])
 
     def update_graph_2(self):
-        frame = self.graphs['graph2']
-        x_global_best, x_local_best, y = list(), list(), list()
-        for i in self.graphs_data.get('graph2', list()):
-            _y, _x_local_best, _x_global_best = i
-            x_local_best.append(_x_local_best)
-            x_global_best.append(_x_global_best)
-            y.append(_y)
-
-        for widget in frame.winfo_children():
-            widget.destroy()
-        fig = Figure(figsize=(7, 6), dpi=75)
-        fig.suptitle('OverallBest/CurrentBest Fitness by Generation', fontsize=20)
-        plot1 = fig.add_subplot(111)
-        plot1.plot(
-            y,
-            x_global_best,
-            color='r',
-        )
-        plot1.plot(
-            y,
-            x_local_best,
-            color='g',
-        )
-        plot1.set_ylabel("Fitness", fontsize=14)
-        plot1.set_xlabel("Generation", fontsize=14)
-        canvas = FigureCanvasTkAgg(fig, master=frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack()
-        toolbar = NavigationToolbar2Tk(canvas, frame)
-        toolbar.update()
-        canvas.get_tk_widget().pack()
+        history = self.graphs_data['graph2']
+        self.update_graph(self.graphs['graph2'], history.get(0), [history.get(2), history.get(1)])
+
+    @staticmethod
+    def update_graph(graph: dict, x, ys: list):
+
+        """
+            Sets the lines data in place. The axes only get a full
+            redraw when the data leaves the current limits (with some
+            headroom so that this stays rare), otherwise the saved
+            background is restored and only the lines are blitted.
+        """
+
+        plot1, canvas = graph['axes'], graph['canvas']
+        for line, y in zip(graph['lines'], ys):
+            line.set_data(x, y)
+        if not x:
+            canvas.draw_idle()
+            return
+
+        x_min, x_max = plot1.get_xlim()
+        y_min, y_max = plot1.get_ylim()
+        data_y_min = min(min(y) for y in ys)
+        data_y_max = max(max(y) for y in ys)
+        if not graph['is_fitted'] or graph['background'] is None or x[-1] > x_max or data_y_min < y_min or data_y_max > y_max:
+            margin = (data_y_max - data_y_min) * 0.1 or abs(data_y_max) * 0.1 or 1
+            plot1.set_xlim(x[0], max(x[-1] * 2, x[0] + 10))
+            plot1.set_ylim(data_y_min - margin, data_y_max + margin)
+            graph['is_fitted'] = True
+            canvas.draw()
+            return
+
+        canvas.restore_region(graph['background'])
+        for line in graph['lines']:
+            plot1.draw_artist(line)
+        canvas.blit(plot1.bbox)
 
     def start_endless(self):
         self.start(with_threshold=False)
@@ -217,77 +277,156 @@ class AppGUI:
 
     def start(self, with_threshold: bool):
 
-        self.genetic_algorithm = RouteOptimizationGeneticAlgorithm()
-        self.graphs_data = dict()
-
+        if self.is_genetic_algorithm_running is True:
+            return
+
+        genetic_algorithm = RouteOptimizationGeneticAlgorithm()
+        try:
+            genetic_algorithm.init(
+                available_coordinates=self.routes,
+                population_size=int(self.population_count.get()),
+                mutation_rate=float(self.mutation_rate_percent.get()) / 100,  # Convert % to Decimal
+                minimizing_factor=float(self.minimizing_factor.get()),
+                profile=True,
+            )
+        except Exception as error:
+            # -- e.g. fewer than two routes clicked, or an option that is not a number -- #
+            messagebox.showerror('Cannot start', f'{type(error).__name__}: {error}')
+            return
+
+        self.genetic_algorithm = genetic_algorithm
+        self.reset_graphs_data()
         self.is_genetic_algorithm_running = True
-        self.genetic_algorithm.init(
-            available_coordinates=self.routes,
-            population_size=int(self.population_count.get()),
-            mutation_rate=float(self.mutation_rate_percent.get()) / 100,  # Convert % to Decimal
-            minimizing_factor=float(self.minimizing_factor.get()),
-        )
-
-        while self.is_genetic_algorithm_running is True:
-
-            # -- Check for Threshold condition (100) -- #
-            if with_threshold is True:
-                if self.genetic_algorithm.generation - self.genetic_algorithm.best_generation >= 100:
-                    break
-
-            # -- Next Generation -- #
-            self.genetic_algorithm.set_next_generation()
-
-            # -- Function to create  connections -- #
-            connections = list()
-            start = None
-            last = None
-            for i in self.genetic_algorithm.best_population_order.data:
-                if start is None:
-                    start = last = i
-                    continue
-                connections.append((*i, *last))
-                last = i
-            # connections.append((*last, *start))
-
-            self.average_fitness.set(f'{round(self.genetic_algorithm.average_fitness * 100, ndigits=2)}')
-            self.best_fitness.set(f'{round(self.genetic_algorithm.best_population_order.fitness_score * 100, ndigits=2)}')
-            self.best_generation.set(f'{self.genetic_algorithm.best_generation}')
-            self.best_distance.set(f'{round(self.genetic_algorithm.best_population_order.total_distance, ndigits=2)}')
-            self.generations.set(f'{self.genetic_algorithm.generation}')
-            d = self.graphs_data.get('graph1', list())
-            d.append((self.genetic_algorithm.generation, round(self.genetic_algorithm.best_population_order.total_distance, ndigits=2)))
-            self.graphs_data['graph1'] = d
-
-            d = self.graphs_data.get('graph2', list())
-            d.append((self.genetic_algorithm.generation, self.genetic_algorithm.best_population_order.fitness_score, self.genetic_algorithm.current_best_population_order.fitness_score))
-            self.graphs_data['graph2'] = d
-
-            # -- Clear previous connections from route map -- #
-            self.clear_connections()
-
-            # -- Add new connections to route map -- #
-            for conn in connections:
-                self.add_route_connection(*conn)
 
-            # -- Sleep so that GUI is interactive -- #
-            self.__waiting__(msec=50)
+        # -- Evolve in a worker thread, the UI polls its snapshots -- #
+        self.stop_event = threading.Event()
+        self.snapshots = queue.Queue()
+        self.worker = threading.Thread(
+            target=self.evolve,
+            args=(genetic_algorithm, with_threshold, self.stop_event, self.snapshots),
+            daemon=True,
+        )
+        self.worker.start()
+        self.poll_snapshots(self.snapshots)
 
-        self.update_graph_1()
-        self.update_graph_2()
+    @staticmethod
+    def evolve(genetic_algorithm: RouteOptimizationGeneticAlgorithm, with_threshold: bool, stop_event: threading.Event,
+               snapshots: queue.Queue):
+
+        """
+            Worker Thread: runs generations at full speed, pushing a
+            snapshot after each one. Everything it touches belongs to
+            its own run, so a reset run cannot leak into the next one.
+        """
+
+        try:
+            # -- Threshold condition (100 generations without improvement) -- #
+            until = StoppingCriteria(threshold=100 if with_threshold is True else 0)
+            until.start()
+            while not stop_event.is_set() and not until.is_met(genetic_algorithm):
+
+                # -- Next Generation -- #
+                genetic_algorithm.set_next_generation()
+                snapshots.put({
+                    'generation': genetic_algorithm.generation,
+                    'best_generation': genetic_algorithm.best_generation,
+                    'average_fitness': genetic_algorithm.average_fitness,
+                    'best_population_order': genetic_algorithm.best_population_order,
+                    'current_best_fitness': genetic_algorithm.current_best_population_order.fitness_score,
+                    'generation_seconds': genetic_algorithm.profiler.last_generation_seconds,
+                })
+        finally:
+            # -- Finished marker, even when a generation raised -- #
+            snapshots.put(None)
+
+    def poll_snapshots(self, snapshots: queue.Queue):
+
+        """
+            UI Thread: every frame_interval msec, drains the snapshots
+            queue. Every snapshot is kept for the graphs, but only the
+            latest one is rendered. Polling stops once the run is over
+            or its queue is no longer the current one (reset / new run).
+        """
+
+        if snapshots is not self.snapshots:
+            return
+        snapshot = None
+        is_finished = False
+        while True:
+            try:
+                item = snapshots.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                is_finished = True
+                continue
+            snapshot = item
+            best = snapshot['best_population_order']
+            self.graphs_data['graph1'].append(snapshot['generation'], best.total_distance)
+            self.graphs_data['graph2'].append(snapshot['generation'], best.fitness_score, snapshot['current_best_fitness'])
+
+        if snapshot is not None:
+            self.render_snapshot(snapshot)
+            # -- Live graphs -- #
+            self.update_graph_1()
+            self.update_graph_2()
+
+        if is_finished is True:
+            self.is_genetic_algorithm_running = False
+            self.update_graph_1()
+            self.update_graph_2()
+            return
+
+        self.window.after(self.frame_interval, self.poll_snapshots, snapshots)
+
+    def render_snapshot(self, snapshot: dict):
+
+        """     Updates the Options frame stats and the route map from a snapshot     """
+
+        best = snapshot['best_population_order']
+
+        self.average_fitness.set(f'{round(snapshot["average_fitness"] * 100, ndigits=2)}')
+        self.best_fitness.set(f'{round(best.fitness_score * 100, ndigits=2)}')
+        self.best_generation.set(f'{snapshot["best_generation"]}')
+        self.best_distance.set(f'{round(best.total_distance, ndigits=2)}')
+        self.generations.set(f'{snapshot["generation"]}')
+        self.generation_time.set(f'{round(snapshot["generation_seconds"] * 1000, ndigits=2)}')
+
+        # -- Route map only changes with the best order -- #
+        if best is self.rendered_population_order:
+            return
+        self.rendered_population_order = best
+
+        # -- Function to create  connections -- #
+        connections = list()
+        start = None
+        last = None
+        for i in self.genetic_algorithm.get_coordinates(best):
+            if start is None:
+                start = last = i
+                continue
+            connections.append((*i, *last))
+            last = i
+        # connections.append((*last, *start))
+
+        self.update_route_connections(connections)
 
     def stop(self):
-        self.is_genetic_algorithm_running = False
-        # -- Update Graphs -- #
-        self.update_graph_1()
-        self.update_graph_2()
+        # -- The worker finishes its generation, then the graphs are updated -- #
+        self.stop_event.set()
 
     def reset(self):
         self.set_options_frame_defaults()
         self.routes = list()
+        self.clear_connections()
         self.canvas_id.delete('all')
+        # -- Stop the run and drop its queue: snapshots still in it are stale -- #
+        self.stop_event.set()
+        self.snapshots = None
         self.is_genetic_algorithm_running = False
-        self.graphs_data = dict()
+        self.reset_graphs_data()
+        self.update_graph_1()
+        self.update_graph_2()
 
     def add_route(self, event):
         ratio = 3
@@ -297,24 +436,39 @@ class AppGUI:
         center = self.find_center_oval(x1, y1, x2, y2)
         self.routes.append(center)
 
+    def update_route_connections(self, connections: list):
+
+        """
+            Reuses the existing canvas lines: only the lines whose
+            connection changed are moved with coords(), missing lines
+            are created and extra lines are deleted.
+        """
+
+        for index, conn in enumerate(connections):
+            if index >= len(self.route_connections):
+                self.add_route_connection(*conn)
+            elif self.route_segments[index] != conn:
+                self.canvas_id.coords(self.route_connections[index], *conn)
+                self.route_segments[index] = conn
+        extra = self.route_connections[len(connections):]
+        if extra:
+            self.canvas_id.delete(*extra)
+            del self.route_connections[len(connections):]
+            del self.route_segments[len(connections):]
+
     def add_route_connection(self, x1, y1, x2, y2):
-        line_id = self.canvas_id.create_line(x1, y1, x2, y2, fill="black", tags=f"{x1},{y1},{x2},{y2}")
+        line_id = self.canvas_id.create_line(x1, y1, x2, y2, fill="black")
         self.route_connections.append(line_id)
+        self.route_segments.append((x1, y1, x2, y2))
 
     def clear_connections(self):
-        while self.route_connections:
-            line_id = self.route_connections.pop(0)
-            self.canvas_id.delete(line_id)
+        if self.route_connections:
+            self.canvas_id.delete(*self.route_connections)
+        self.route_connections = list()
+        self.route_segments = list()
+        self.rendered_population_order = None
 
     @staticmethod
     def find_center_oval(x1, y1, x2, y2) -> tuple:
         """     Returns x,y location of center of Oval      """
         return int((x1 + x2)/2), int((y1+y2)/2)
-
-    def __waiting__(self, msec: int):
-
-        """     Sleep Function for Tkiner   """
-
-        var = tk.IntVar()
-        self.window.after(msec, var.set, 1)
-        self.window.wait_variable(var)
@@ -0,0 +1,47 @@
+import random
+from app.genetic_algorithm import PopulationOrder, RouteOptimizationGeneticAlgorithm
+
+
+def get_walked_distance(po: PopulationOrder, distance_matrix: list) -> float:
+    walked = po.create_copy()
+    walked.set_total_distance(distance_matrix)
+    return walked.total_distance
+
+
+def get_walked_order(size: int, seed: int) -> tuple:
+    generator = random.Random(seed)
+    coordinates = [(generator.uniform(0, 1000), generator.uniform(0, 1000)) for _ in range(size)]
+    distance_matrix = RouteOptimizationGeneticAlgorithm.get_distance_matrix(coordinates)
+    po = PopulationOrder(range(size), rng=generator)
+    po.set_total_distance(distance_matrix)
+    return po, distance_matrix, generator
+
+
+def test_mutation_deltas_match_a_full_walk():
+    for mutation in ('swap', 'reverse', 'insert'):
+        for size in (2, 3, 4, 10):
+            po, distance_matrix, generator = get_walked_order(size, seed=size)
+            for _ in range(200):
+                # -- Both ends and neighbouring positions included -- #
+                index1, index2 = generator.randrange(size), generator.randrange(size)
+                before = po.total_distance
+                delta = getattr(po, mutation)(index1, index2, distance_matrix)
+                assert abs(po.total_distance - get_walked_distance(po, distance_matrix)) < 1e-6, (mutation, size, index1, index2)
+                assert abs(po.total_distance - before - delta) < 1e-9
+            assert sorted(po.data) == list(range(size))
+
+
+def test_create_copy_carries_total_distance():
+    po, distance_matrix, _ = get_walked_order(10, seed=0)
+    copy = po.create_copy()
+    assert copy.total_distance == po.total_distance
+    assert copy.data == po.data and copy.data is not po.data
+    copy.swap(0, 9, distance_matrix)
+    assert po.total_distance == get_walked_distance(po, distance_matrix)
+
+
+def test_mutating_an_unwalked_order_keeps_it_unwalked():
+    po = PopulationOrder(range(5), do_shuffle=False)
+    distance_matrix = RouteOptimizationGeneticAlgorithm.get_distance_matrix([(i, i * i) for i in range(5)])
+    po.swap(0, 4, distance_matrix)
+    assert po.total_distance is None